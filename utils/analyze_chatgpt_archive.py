@@ -15,16 +15,1318 @@ Commands:
   search      - Search conversations by criteria
   stats       - Show statistics
   export      - Export data to various formats
+  bundle      - Write a sharded bundle for the desktop viewer
+  assets      - Index asset pointers and attachments
+  snapshot    - Build or query a memory-mapped message text snapshot
+  batch       - Run several commands against one loaded archive
 """
 
 import json
 import sys
 import os
 import re
-from collections import defaultdict, Counter
-from datetime import datetime
+import csv
+import gzip
+import math
+import mmap
+import queue
+import random
+import shlex
+import shutil
+import struct
+import tempfile
+import base64
+import hashlib
+import html
+import bisect
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict, deque, Counter
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
 import argparse
 
+EXPORT_TYPES = ['conversations', 'projects', 'fields', 'stats', 'schema']
+EXPORT_FORMATS = ['json', 'csv', 'txt']
+EXPORT_QUEUE_SIZE = 256  # Conversations buffered per export target
+BUNDLE_SHARD_SIZE = 100  # Conversations per viewer bundle shard
+BUNDLE_VERSION = 1
+ASSET_INDEX_VERSION = 1
+REGEX_MIN_LITERAL = 2  # Shortest literal run used to prefilter a regex
+SNAPSHOT_MAGIC = b'CGPTSNAP'
+SNAPSHOT_VERSION = 2
+SNAPSHOT_ROLES = ['user', 'assistant', 'system', 'tool']
+HASH_CHUNK_SIZE = 1 << 20
+
+REPORT_FORMATS = ['text', 'json', 'markdown', 'html']
+REPORT_EXTENSIONS = {'.json': 'json', '.md': 'markdown', '.markdown': 'markdown', '.html': 'html', '.htm': 'html'}
+MEMORY_REPORT_FIELDS = ['memory_scope', 'is_do_not_remember', 'context_scopes', 'sugar_item_id', 'owner']
+
+FIELD_CATEGORIES = {
+    'projects': ['gizmo_id', 'gizmo_type', 'conversation_template_id'],
+    'memory': ['memory_scope', 'is_do_not_remember', 'context_scopes'],
+    'security': ['safe_urls', 'blocked_urls', 'disabled_tool_ids', 'moderation_results'],
+    'user': ['owner', 'sugar_item_id', 'sugar_item_visible', 'is_starred']
+}
+
+
+def format_bytes(size):
+    """Human-readable byte count"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def fold_case(text):
+    """Lowercase text without changing its length, so offsets still index the original
+
+    Characters whose lowercase form is longer than one code point (e.g. 'İ')
+    are left as they are.
+    """
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return ''.join(lower if len(lower) == 1 else ch for ch, lower in ((ch, ch.lower()) for ch in text))
+
+
+def hash64(value):
+    """Stable 64-bit hash of a value's string form, used by the sketches"""
+    data = value if isinstance(value, bytes) else str(value).encode('utf-8', 'surrogatepass')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+class HyperLogLog:
+    """Distinct-count estimator using 2**precision one-byte registers"""
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    def add(self, value):
+        self.add_hash(hash64(value))
+
+    def add_hash(self, h):
+        index = h & (self.m - 1)
+        w = h >> self.precision
+        rank = (64 - self.precision) - w.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def relative_error(self):
+        """Standard error of the estimate as a fraction"""
+        return 1.04 / math.sqrt(self.m)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLogs with different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def to_dict(self):
+        return {'precision': self.precision, 'registers': base64.b64encode(bytes(self.registers)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['precision'])
+        sketch.registers = bytearray(base64.b64decode(data['registers']))
+        return sketch
+
+
+class CountMinSketch:
+    """Frequency estimator; estimates never undercount and overcount by at most
+    error_rate() * total with probability 1 - failure_probability()"""
+
+    def __init__(self, width=2048, depth=5):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.table = [[0] * width for _ in range(depth)]
+
+    def _indexes(self, h):
+        # Derive all row hashes from one 64-bit hash (Kirsch-Mitzenmacher)
+        h1, h2 = h & 0xffffffff, (h >> 32) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add_hash(self, h, count=1):
+        self.total += count
+        for row, index in zip(self.table, self._indexes(h)):
+            row[index] += count
+
+    def estimate_hash(self, h):
+        return min(row[index] for row, index in zip(self.table, self._indexes(h)))
+
+    def error_rate(self):
+        return math.e / self.width
+
+    def failure_probability(self):
+        return math.exp(-self.depth)
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("cannot merge count-min sketches with different dimensions")
+        self.total += other.total
+        for row, other_row in zip(self.table, other.table):
+            for i, value in enumerate(other_row):
+                row[i] += value
+
+    def to_dict(self):
+        return {'width': self.width, 'depth': self.depth, 'total': self.total, 'table': self.table}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['width'], data['depth'])
+        sketch.total = data['total']
+        sketch.table = data['table']
+        return sketch
+
+
+class HeavyHitters:
+    """Top-k items by count-min estimate, plus a HyperLogLog of distinct items"""
+
+    def __init__(self, capacity=50):
+        self.capacity = capacity
+        self.counts = CountMinSketch()
+        self.distinct = HyperLogLog()
+        self.candidates = {}
+        self._min_count = 0  # Lower bound on the smallest candidate estimate
+
+    def add(self, item, count=1):
+        h = hash64(item)
+        self.counts.add_hash(h, count)
+        self.distinct.add_hash(h)
+        self._offer(item, self.counts.estimate_hash(h))
+
+    def _offer(self, item, estimate):
+        if item in self.candidates or len(self.candidates) < self.capacity:
+            self.candidates[item] = estimate
+            return
+        if estimate <= self._min_count:
+            return
+
+        smallest = min(self.candidates, key=self.candidates.get)
+        if estimate > self.candidates[smallest]:
+            del self.candidates[smallest]
+            self.candidates[item] = estimate
+        self._min_count = min(self.candidates.values())
+
+    def top(self, n=10):
+        return sorted(self.candidates.items(), key=lambda x: x[1], reverse=True)[:n]
+
+    def error_bound(self):
+        """Maximum overcount of any estimate (with probability 1 - failure_probability)"""
+        return int(math.ceil(self.counts.error_rate() * self.counts.total))
+
+    def merge(self, other):
+        self.counts.merge(other.counts)
+        self.distinct.merge(other.distinct)
+        items = set(self.candidates) | set(other.candidates)
+        self.candidates = {}
+        self._min_count = 0
+        for item, estimate in sorted(((i, self.counts.estimate_hash(hash64(i))) for i in items),
+                                     key=lambda x: x[1], reverse=True)[:self.capacity]:
+            self.candidates[item] = estimate
+
+    def to_dict(self):
+        return {'capacity': self.capacity, 'counts': self.counts.to_dict(),
+                'distinct': self.distinct.to_dict(), 'candidates': self.candidates}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['capacity'])
+        sketch.counts = CountMinSketch.from_dict(data['counts'])
+        sketch.distinct = HyperLogLog.from_dict(data['distinct'])
+        sketch.candidates = dict(data['candidates'])
+        return sketch
+
+
+class KLLSketch:
+    """KLL quantile sketch with normalized rank error of roughly rank_error()"""
+
+    def __init__(self, k=200, c=2 / 3, rng=None):
+        self.k = k
+        self.c = c
+        self.rng = rng or random.Random(0)
+        self.compactors = []
+        self.count = 0
+        self.min = None
+        self.max = None
+        self._size = 0
+        self._max_size = 0
+        self._grow()
+
+    def _grow(self):
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _capacity(self, level):
+        height = len(self.compactors) - level - 1
+        return int(math.ceil(self.c ** height * self.k)) + 1
+
+    def add(self, value):
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self.compactors[0].append(value)
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        while self._size >= self._max_size:
+            for level, items in enumerate(self.compactors):
+                if len(items) >= self._capacity(level):
+                    if level + 1 >= len(self.compactors):
+                        self._grow()
+                    # Keep every other sorted item (random offset) at double weight
+                    items.sort()
+                    keep = len(items) % 2
+                    promoted = items[keep + self.rng.randrange(2)::2] if len(items) - keep else []
+                    self.compactors[level + 1].extend(promoted)
+                    self.compactors[level] = items[:keep]
+                    break
+            self._size = sum(len(items) for items in self.compactors)
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        weighted = sorted((value, 1 << level) for level, items in enumerate(self.compactors) for value in items)
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def rank_error(self):
+        return 1.65 / self.k
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        self._size = sum(len(items) for items in self.compactors)
+        self._compress()
+
+    def to_dict(self):
+        return {'k': self.k, 'c': self.c, 'count': self.count, 'min': self.min, 'max': self.max,
+                'compactors': self.compactors}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['k'], data['c'])
+        sketch.compactors = []
+        for items in data['compactors']:
+            sketch._grow()
+            sketch.compactors[-1] = list(items)
+        sketch.count = data['count']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        sketch._size = sum(len(items) for items in sketch.compactors)
+        return sketch
+
+
+class ReservoirSample:
+    """Uniform sample of at most k items from a stream of unknown length"""
+
+    def __init__(self, k=5, rng=None):
+        self.k = k
+        self.seen = 0
+        self.items = []
+        self.rng = rng or random.Random(0)
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.k:
+            self.items.append(item)
+        else:
+            j = self.rng.randrange(self.seen)
+            if j < self.k:
+                self.items[j] = item
+
+
+class ApproximateStats:
+    """Fixed-memory, mergeable replacement for the exact statistics aggregations"""
+
+    WORD_PATTERN = re.compile(r"[^\W\d_]{3,}")
+    VERSION = 1
+
+    def __init__(self):
+        self.conversations = 0
+        self.messages = 0
+        self.message_lengths = KLLSketch()
+        self.create_times = KLLSketch()
+        self.months = Counter()  # Bounded by the number of months in the archive
+        self.titles = HeavyHitters()
+        self.words = HeavyHitters()
+        self.models = HeavyHitters()
+        self.projects = HeavyHitters()
+
+    SKETCHES = ['message_lengths', 'create_times', 'titles', 'words', 'models', 'projects']
+
+    def add(self, conv):
+        self.conversations += 1
+
+        title = conv.get('title')
+        if title:
+            self.titles.add(title)
+        model = conv.get('default_model_slug')
+        if model:
+            self.models.add(model)
+        gizmo_id = conv.get('gizmo_id')
+        if gizmo_id:
+            self.projects.add(gizmo_id)
+
+        create_time = conv.get('create_time')
+        if create_time:
+            self.create_times.add(create_time)
+            self.months[datetime.fromtimestamp(create_time).strftime('%Y-%m')] += 1
+
+        mapping = conv.get('mapping') or {}
+        for message_data in mapping.values():
+            if isinstance(message_data, dict) and message_data.get('message'):
+                content = message_data['message'].get('content', {})
+                self.messages += 1
+                length = 0
+                if isinstance(content, dict):
+                    for part in content.get('parts', []):
+                        if isinstance(part, str):
+                            length += len(part)
+                            for word in self.WORD_PATTERN.findall(part.lower()):
+                                self.words.add(word)
+                self.message_lengths.add(length)
+
+    def merge(self, other):
+        self.conversations += other.conversations
+        self.messages += other.messages
+        self.months.update(other.months)
+        for name in self.SKETCHES:
+            getattr(self, name).merge(getattr(other, name))
+
+    def to_dict(self):
+        data = {
+            'version': self.VERSION,
+            'conversations': self.conversations,
+            'messages': self.messages,
+            'months': dict(self.months)
+        }
+        for name in self.SKETCHES:
+            data[name] = getattr(self, name).to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != cls.VERSION:
+            raise ValueError(f"unsupported sketch version {data.get('version')}")
+        stats = cls()
+        stats.conversations = data['conversations']
+        stats.messages = data['messages']
+        stats.months = Counter(data['months'])
+        stats.message_lengths = KLLSketch.from_dict(data['message_lengths'])
+        stats.create_times = KLLSketch.from_dict(data['create_times'])
+        for name in ['titles', 'words', 'models', 'projects']:
+            setattr(stats, name, HeavyHitters.from_dict(data[name]))
+        return stats
+
+
+class FieldProfile:
+    """Fixed-size statistics for every value observed at one JSON path"""
+
+    SAMPLE_LENGTH = 80  # Truncate sampled strings so samples stay bounded
+
+    def __init__(self, rng):
+        self.count = 0
+        self.types = Counter()
+        self.distinct = HyperLogLog()
+        self.samples = ReservoirSample(rng=rng)
+        self.min = None
+        self.max = None
+
+    def add(self, value, type_name):
+        self.count += 1
+        self.types[type_name] += 1
+        if type_name in ('object', 'array', 'null'):
+            return
+
+        self.distinct.add(f"{type_name}:{value}")
+        if type_name in ('integer', 'number'):
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+            self.samples.add(value)
+        else:
+            text = str(value)
+            self.samples.add(text[:self.SAMPLE_LENGTH] + ('...' if len(text) > self.SAMPLE_LENGTH else ''))
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'types': {t: round(c / self.count, 4) for t, c in self.types.most_common()},
+            'null_rate': round(self.types['null'] / self.count, 4),
+            'distinct_estimate': self.distinct.count() if self.samples.seen else None,
+            'min': self.min,
+            'max': self.max,
+            'samples': list(self.samples.items)
+        }
+
+
+class SchemaProfiler:
+    """Recursive schema profiler covering every JSON path in the conversations
+
+    Mapping node IDs are collapsed to ``*`` and list items to ``[]`` so that
+    e.g. ``mapping.*.message.author.role`` aggregates all messages. Each path
+    keeps a fixed-size FieldProfile, so memory does not grow with archive size.
+    """
+
+    def __init__(self, seed=0):
+        self.paths = {}
+        self.rng = random.Random(seed)
+
+    def add(self, conv):
+        self._visit('', conv)
+
+    def _visit(self, path, value):
+        if value is None:
+            type_name = 'null'
+        elif isinstance(value, bool):
+            type_name = 'boolean'
+        elif isinstance(value, int):
+            type_name = 'integer'
+        elif isinstance(value, float):
+            type_name = 'number'
+        elif isinstance(value, str):
+            type_name = 'string'
+        elif isinstance(value, dict):
+            type_name = 'object'
+        elif isinstance(value, list):
+            type_name = 'array'
+        else:
+            type_name = type(value).__name__
+
+        if path:
+            profile = self.paths.get(path)
+            if profile is None:
+                profile = self.paths[path] = FieldProfile(self.rng)
+            profile.add(value, type_name)
+
+        if type_name == 'object':
+            wildcard = path == 'mapping'
+            for key, child in value.items():
+                child_key = '*' if wildcard else key
+                self._visit(f"{path}.{child_key}" if path else child_key, child)
+        elif type_name == 'array':
+            for child in value:
+                self._visit(f"{path}[]", child)
+
+    def report(self):
+        return {path: self.paths[path].summary() for path in sorted(self.paths)}
+
+
+class AnalysisReport:
+    """Structured result of a full analysis, computed once and rendered on demand"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def to_dict(self):
+        return self.data
+
+    def render(self, format_type='text'):
+        renderers = {
+            'text': self.render_text,
+            'json': self.render_json,
+            'markdown': self.render_markdown,
+            'html': self.render_html
+        }
+        return renderers[format_type]()
+
+    def save(self, output_file, format_type=None):
+        """Render the report to a file, picking the format from the extension if not given"""
+        if format_type is None:
+            format_type = REPORT_EXTENSIONS.get(os.path.splitext(output_file)[1].lower(), 'text')
+        content = self.render(format_type)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(content if content.endswith('\n') else content + '\n')
+
+    def render_json(self):
+        return json.dumps(self.data, indent=2, ensure_ascii=False, default=str)
+
+    def render_text(self):
+        d = self.data
+        summary = d['summary']
+        lines = []
+        lines.append("\n" + "="*80)
+        lines.append("🎯 CHATGPT ARCHIVE ANALYSIS REPORT")
+        lines.append("="*80)
+
+        lines.append(f"\n📁 File: {d['file']}")
+        lines.append(f"📊 Total conversations: {summary['total_conversations']}")
+        lines.append(f"🏷️ Conversations with projects: {summary['project_conversations']}")
+        lines.append(f"📋 Standalone conversations: {summary['standalone_conversations']}")
+        lines.append(f"📂 Unique projects: {summary['unique_projects']}")
+
+        lines.append("\n🔍 ALL METADATA FIELDS DISCOVERED:")
+        lines.append("-" * 40)
+        for i, field in enumerate(d['fields'], 1):
+            samples = field['samples'][:3]
+            sample_str = ", ".join(samples) if samples else "no samples"
+            lines.append(f"{i:2d}. {field['name']}: {sample_str}")
+
+        lines.append("\n🏗️ PROJECT ANALYSIS:")
+        lines.append("-" * 40)
+        lines.append(f"Total projects found: {summary['unique_projects']}")
+        for project in d['projects'][:5]:
+            lines.append(f"• {project['id']}: {project['conversation_count']} conversations")
+            if project['sample_title']:
+                sample_title = project['sample_title'][:50]
+                lines.append(f"  └─ Sample: {sample_title}{'...' if len(sample_title) == 50 else ''}")
+
+        lines.append("\n💾 MEMORY & USER DATA FIELDS:")
+        lines.append("-" * 40)
+        for field, samples in d['memory_fields'].items():
+            lines.append(f"• {field}: {', '.join(samples) if samples else 'present'}")
+
+        lines.append("\n🔐 SECURITY & ACCESS FIELDS:")
+        lines.append("-" * 40)
+        for field, count in d['security_fields'].items():
+            lines.append(f"• {field}: present in {count} conversations")
+
+        content = d['content']
+        if content:
+            lines.append("\n📊 CONTENT STATISTICS:")
+            lines.append("-" * 40)
+            for label, value in self._content_rows():
+                lines.append(f"• {label}: {value}")
+
+        lines.append("\n" + "="*80)
+        return "\n".join(lines)
+
+    def _content_rows(self):
+        content = self.data['content']
+        user = self.data['user']
+        rows = [
+            ('Total messages', content.get('total_messages', 0)),
+            ('AI models used', content.get('model_usage', {})),
+            ('Message types', content.get('message_types', {})),
+            ('Content types', content.get('content_types', {})),
+            ('Average message length', f"{content.get('average_message_length', 0)} characters"),
+        ]
+        if content.get('date_range'):
+            rows.append(('Date range', f"{content['date_range'][0]} to {content['date_range'][1]}"))
+        rows.append(('Conversations with user profile data', user['profile_conversations']))
+        rows.append(('Conversations with memory data', user['memory_conversations']))
+        return rows
+
+    def _sections(self):
+        """Report as (heading, [(label, value), ...]) pairs for the document renderers"""
+        d = self.data
+        summary = d['summary']
+        return [
+            ('Summary', [
+                ('File', d['file']),
+                ('Total conversations', summary['total_conversations']),
+                ('Conversations with projects', summary['project_conversations']),
+                ('Standalone conversations', summary['standalone_conversations']),
+                ('Unique projects', summary['unique_projects']),
+            ]),
+            ('Metadata Fields', [
+                (f['name'], f"{f['count']} conversations" + (f" ({', '.join(f['samples'][:3])})" if f['samples'] else ''))
+                for f in d['fields']
+            ]),
+            ('Projects', [
+                (p['id'], f"{p['conversation_count']} conversations"
+                          + (f" ({', '.join(p['derived_names'])})" if p['derived_names'] else ''))
+                for p in d['projects']
+            ]),
+            ('Memory & User Data Fields', [
+                (field, ', '.join(samples) if samples else 'present')
+                for field, samples in d['memory_fields'].items()
+            ]),
+            ('Security & Access Fields', [
+                (field, f"present in {count} conversations")
+                for field, count in d['security_fields'].items()
+            ]),
+            ('Content Statistics', self._content_rows() if d['content'] else []),
+        ]
+
+    def render_markdown(self):
+        lines = ["# ChatGPT Archive Analysis Report"]
+        for heading, rows in self._sections():
+            lines.append(f"\n## {heading}\n")
+            if not rows:
+                lines.append("_None_")
+                continue
+            lines.append("| Item | Value |")
+            lines.append("| --- | --- |")
+            for label, value in rows:
+                cells = [str(c).replace('|', '\\|').replace('\n', ' ') for c in (label, value)]
+                lines.append(f"| {cells[0]} | {cells[1]} |")
+        return "\n".join(lines) + "\n"
+
+    def render_html(self):
+        parts = [
+            "<!DOCTYPE html>",
+            "<html><head><meta charset=\"utf-8\"><title>ChatGPT Archive Analysis Report</title>",
+            "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse}"
+            "td,th{border:1px solid #ccc;padding:4px 8px;text-align:left;vertical-align:top}</style>",
+            "</head><body>",
+            "<h1>ChatGPT Archive Analysis Report</h1>"
+        ]
+        for heading, rows in self._sections():
+            parts.append(f"<h2>{html.escape(heading)}</h2>")
+            if not rows:
+                parts.append("<p><em>None</em></p>")
+                continue
+            parts.append("<table>")
+            for label, value in rows:
+                parts.append(f"<tr><th>{html.escape(str(label))}</th><td>{html.escape(str(value))}</td></tr>")
+            parts.append("</table>")
+        parts.append("</body></html>")
+        return "\n".join(parts) + "\n"
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton reporting every (word index, end offset) in one pass"""
+
+    def __init__(self, words):
+        self.words = list(words)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for index, word in enumerate(self.words):
+            state = 0
+            for ch in word:
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][ch] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = next_state
+            self.out[state].append(index)
+
+        # Breadth-first failure links; outputs inherit those of their failure state
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for ch, next_state in self.goto[state].items():
+                pending.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(ch, 0)
+                self.out[next_state] = self.out[next_state] + self.out[self.fail[next_state]]
+
+    def iter(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                yield index, i
+
+
+def required_literals(pattern, flags=0):
+    """Literals of which at least one occurs in every match of a regex, or None
+
+    Walks the parsed pattern for runs of literal characters (looking through
+    groups), alternations whose branches all have one, and repeats of at least
+    one. The result is folded with fold_case(), so it can prefilter matches on
+    folded text whatever the regex's case sensitivity. Only ASCII characters
+    are used, since fold_case() and re.IGNORECASE disagree on others (and on
+    'i' and 's', which also match 'ı', 'İ' and 'ſ' under IGNORECASE).
+    """
+    try:
+        from re import _parser as sre_parse, _constants as sre_constants
+    except ImportError:  # Python < 3.11
+        import sre_parse
+        import sre_constants
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return None
+
+    def usable(ch, ignorecase):
+        return ch.isascii() and not (ignorecase and ch in 'iIsS')
+
+    def walk(items, ignorecase):
+        best_run = ''
+        run = []
+        options = []
+
+        def flush():
+            nonlocal best_run
+            if len(run) > len(best_run):
+                best_run = ''.join(run)
+            run.clear()
+
+        def scan(items, ignorecase):
+            for op, av in items:
+                if op == sre_constants.LITERAL and usable(chr(av), ignorecase):
+                    run.append(chr(av))
+                elif op == sre_constants.SUBPATTERN:
+                    # Scoped flags, e.g. (?i:...) or (?-i:...)
+                    _, add_flags, del_flags, sub = av
+                    scan(sub, bool((ignorecase or add_flags & re.IGNORECASE) and not del_flags & re.IGNORECASE))
+                else:
+                    flush()
+                    if op == sre_constants.BRANCH:
+                        branches = [walk(branch, ignorecase) for branch in av[1]]
+                        if all(branches):
+                            options.append([literal for branch in branches for literal in branch])
+                    elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+                        inner = walk(av[2], ignorecase)
+                        if inner:
+                            options.append(inner)
+
+        scan(items, ignorecase)
+        flush()
+        if len(best_run) >= REGEX_MIN_LITERAL:
+            return [best_run]
+        # Prefer the alternative whose shortest literal is longest (fewest false candidates)
+        options.sort(key=lambda literals: min(len(l) for l in literals), reverse=True)
+        return options[0] if options else None
+
+    literals = walk(parsed, bool(parsed.state.flags & re.IGNORECASE))
+    return [fold_case(literal) for literal in literals] if literals else None
+
+
+class PatternMatcher:
+    """Finds many terms and regexes in one pass over each text
+
+    Literal terms go into a single Aho-Corasick automaton. Each regex is
+    compiled on its own, and the literals every one of its matches must
+    contain are added to the automaton too; a regex only runs on texts where
+    one of its literals was found. Scanning cost is therefore roughly
+    independent of the number of patterns, except for regexes with no
+    required literal, which run on every text.
+    """
+
+    REGEX_PREFIX = 're:'
+
+    def __init__(self, terms=(), regexes=(), case_sensitive=False):
+        self.case_sensitive = case_sensitive
+        self.terms = list(dict.fromkeys(t if case_sensitive else fold_case(t) for t in terms))
+        self.regexes = list(dict.fromkeys(regexes))
+        flags = 0 if case_sensitive else re.IGNORECASE
+        self.compiled = [re.compile(r, flags) for r in self.regexes]
+
+        # Regex prefilter literals; always matched against folded text
+        self.unfiltered = []
+        literal_words, self.literal_owner = [], []
+        for index, regex in enumerate(self.regexes):
+            literals = required_literals(regex, flags)
+            if literals:
+                literal_words.extend(literals)
+                self.literal_owner.extend([index] * len(literals))
+            else:
+                self.unfiltered.append(index)
+
+        if case_sensitive:
+            self.term_automaton = AhoCorasick(self.terms)
+            self.literal_automaton = AhoCorasick(literal_words)
+        else:
+            # One automaton over the folded text serves both terms and regex literals
+            self.term_automaton = AhoCorasick(self.terms + literal_words)
+            self.literal_automaton = None
+
+    @classmethod
+    def from_file(cls, path, case_sensitive=False):
+        """One pattern per line; 're:' prefixes a regex, blank lines and '#' comments are ignored"""
+        terms, regexes = [], []
+        flags = 0 if case_sensitive else re.IGNORECASE
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.rstrip('\n')
+                if not line.strip() or line.lstrip().startswith('#'):
+                    continue
+                if line.startswith(cls.REGEX_PREFIX):
+                    pattern = line[len(cls.REGEX_PREFIX):]
+                    try:
+                        re.compile(pattern, flags)
+                    except re.error as e:
+                        raise ValueError(f"{path}:{line_number}: invalid regex '{pattern}': {e}")
+                    regexes.append(pattern)
+                else:
+                    terms.append(line)
+        return cls(terms, regexes, case_sensitive)
+
+    def __len__(self):
+        return len(self.terms) + len(self.regexes)
+
+    def finditer(self, text):
+        """Yield (pattern, offset, matched text) for every match of every pattern in text
+
+        Term matches may overlap; each regex reports its own non-overlapping
+        matches, independently of the other patterns.
+        """
+        folded = fold_case(text)
+        terms = self.terms
+        term_count = len(terms)
+        candidates = set(self.unfiltered)
+
+        if self.case_sensitive:
+            for index, end in self.term_automaton.iter(text):
+                start = end - len(terms[index]) + 1
+                yield terms[index], start, text[start:end + 1]
+            for index, _ in self.literal_automaton.iter(folded):
+                candidates.add(self.literal_owner[index])
+        else:
+            for index, end in self.term_automaton.iter(folded):
+                if index < term_count:
+                    start = end - len(terms[index]) + 1
+                    yield terms[index], start, text[start:end + 1]
+                else:
+                    candidates.add(self.literal_owner[index - term_count])
+
+        for index in sorted(candidates):
+            for match in self.compiled[index].finditer(text):
+                if match.end() > match.start():
+                    yield self.REGEX_PREFIX + self.regexes[index], match.start(), match.group()
+
+
+class TextSnapshot:
+    """Memory-mapped snapshot of all message text
+
+    Layout: a fixed header, the UTF-8 text of every message concatenated into
+    one blob, the same text case-folded with fold_case() into a second blob
+    (so character offsets in both agree), a string blob for
+    IDs and titles, then fixed-width conversation and message tables holding
+    offsets into those blobs. Opening only reads the header, and every text
+    accessor returns a memoryview slice of the mapping.
+    """
+
+    HEADER = struct.Struct('<8sIIQQQQQQQQQQQd')
+    CONVERSATION = struct.Struct('<QHQIII')   # id off/len, title off/len, first message, message count
+    MESSAGE = struct.Struct('<QIQIIQHB')      # text off/len, folded off/len, conversation, id off/len, role
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            self._file.close()
+            raise ValueError(f"{path} is empty, not a text snapshot")
+        if len(self._mm) < self.HEADER.size:
+            self._mm.close()
+            self._file.close()
+            raise ValueError(f"{path} is too short to be a text snapshot")
+        self.buffer = memoryview(self._mm)
+        (magic, version, _, self.conversation_count, self.message_count,
+         self._text_off, self._text_size, self._folded_off, self._folded_size,
+         self._strings_off, self._strings_size, self._conv_table, self._msg_table,
+         self.source_size, self.source_mtime) = self.HEADER.unpack_from(self._mm, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} text snapshot")
+        ranges = [
+            (self._text_off, self._text_size),
+            (self._folded_off, self._folded_size),
+            (self._strings_off, self._strings_size),
+            (self._conv_table, self.conversation_count * self.CONVERSATION.size),
+            (self._msg_table, self.message_count * self.MESSAGE.size)
+        ]
+        if any(offset < self.HEADER.size or offset + size > len(self._mm) for offset, size in ranges):
+            self.close()
+            raise ValueError(f"{path} is truncated or corrupt")
+
+    def close(self):
+        if getattr(self, 'buffer', None) is not None:
+            self.buffer.release()
+            self.buffer = None
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @classmethod
+    def build(cls, conversations, output_file, source_file=None):
+        """Write a snapshot of every string message part (parts joined with newlines)"""
+        strings = bytearray()
+        conv_table = bytearray()
+        msg_table = bytearray()
+        text_size = folded_size = 0
+        message_index = 0
+
+        def add_string(value):
+            data = (value or '').encode('utf-8', 'surrogatepass')
+            offset = len(strings)
+            strings.extend(data)
+            return offset, len(data)
+
+        with open(output_file, 'wb') as out, tempfile.TemporaryFile() as folded_out:
+            out.write(b'\0' * cls.HEADER.size)
+            text_off = out.tell()
+            conv_count = 0
+
+            for conv in conversations:
+                if not isinstance(conv, dict):
+                    continue
+                first_message = message_index
+                mapping = conv.get('mapping') or {}
+                for message_id, msg_data in mapping.items():
+                    if not (isinstance(msg_data, dict) and msg_data.get('message')):
+                        continue
+                    msg = msg_data['message']
+                    content = msg.get('content', {})
+                    parts = content.get('parts', []) if isinstance(content, dict) else []
+                    text = '\n'.join(part for part in parts if isinstance(part, str))
+                    raw = text.encode('utf-8', 'surrogatepass')
+                    folded = fold_case(text).encode('utf-8', 'surrogatepass')
+                    author = msg.get('author')
+                    role = author.get('role') if isinstance(author, dict) else None
+
+                    out.write(raw)
+                    folded_out.write(folded)
+                    id_off, id_len = add_string(msg.get('id', message_id))
+                    msg_table.extend(cls.MESSAGE.pack(
+                        text_size, len(raw), folded_size, len(folded), conv_count, id_off, id_len,
+                        SNAPSHOT_ROLES.index(role) if role in SNAPSHOT_ROLES else 255))
+                    text_size += len(raw)
+                    folded_size += len(folded)
+                    message_index += 1
+
+                id_off, id_len = add_string(conv.get('id'))
+                title_off, title_len = add_string(conv.get('title'))
+                conv_table.extend(cls.CONVERSATION.pack(id_off, id_len, title_off, title_len,
+                                                        first_message, message_index - first_message))
+                conv_count += 1
+
+            folded_off = out.tell()
+            folded_out.seek(0)
+            shutil.copyfileobj(folded_out, out)
+            strings_off = out.tell()
+            out.write(strings)
+            conv_table_off = out.tell()
+            out.write(conv_table)
+            msg_table_off = out.tell()
+            out.write(msg_table)
+
+            source_size, source_mtime = AssetIndex.stamp(source_file) if source_file else (0, 0.0)
+            out.seek(0)
+            out.write(cls.HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, conv_count, message_index,
+                                      text_off, text_size, folded_off, folded_size, strings_off, len(strings),
+                                      conv_table_off, msg_table_off, source_size, source_mtime))
+        return conv_count, message_index
+
+    def is_current(self, source_file):
+        return [self.source_size, self.source_mtime] == AssetIndex.stamp(source_file)
+
+    def _string(self, offset, length):
+        start = self._strings_off + offset
+        return str(self.buffer[start:start + length], 'utf-8', 'surrogatepass')
+
+    def conversation(self, index):
+        """Return (id, title, first message index, message count)"""
+        id_off, id_len, title_off, title_len, first, count = self.CONVERSATION.unpack_from(
+            self._mm, self._conv_table + index * self.CONVERSATION.size)
+        return self._string(id_off, id_len), self._string(title_off, title_len), first, count
+
+    def find_conversation(self, conv_id):
+        for index in range(self.conversation_count):
+            if self.conversation(index)[0] == conv_id:
+                return index
+        return None
+
+    def _message_entry(self, index):
+        return self.MESSAGE.unpack_from(self._mm, self._msg_table + index * self.MESSAGE.size)
+
+    def message(self, index):
+        """Return (conversation index, message id, role)"""
+        _, _, _, _, conv_index, id_off, id_len, role = self._message_entry(index)
+        return conv_index, self._string(id_off, id_len), SNAPSHOT_ROLES[role] if role < len(SNAPSHOT_ROLES) else 'unknown'
+
+    def text(self, index):
+        """UTF-8 bytes of one message as a zero-copy memoryview"""
+        text_off, text_len = self._message_entry(index)[:2]
+        start = self._text_off + text_off
+        return self.buffer[start:start + text_len]
+
+    def folded(self, index):
+        folded_off, folded_len = self._message_entry(index)[2:4]
+        start = self._folded_off + folded_off
+        return self.buffer[start:start + folded_len]
+
+    def preview(self, index, length=100):
+        """First length characters of a message, decoding only the bytes needed"""
+        view = self.text(index)
+        head = str(view[:length * 4], 'utf-8', 'ignore')
+        return head[:length], len(view) > len(head[:length].encode('utf-8'))
+
+    def _message_at_folded(self, position):
+        """Binary search the message table for the message containing a folded-blob offset"""
+        lo, hi = 0, self.message_count - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self._message_entry(mid)[2] <= position:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def search(self, query):
+        """Yield (message index, character offset into the original text) for case-insensitive matches of query"""
+        needle = fold_case(query).encode('utf-8', 'surrogatepass')
+        if not needle or not self.message_count:
+            return
+        start, end = self._folded_off, self._folded_off + self._folded_size
+        position = self._mm.find(needle, start, end)
+        while position != -1:
+            relative = position - self._folded_off
+            index = self._message_at_folded(relative)
+            folded_off, folded_len = self._message_entry(index)[2:4]
+            if relative + len(needle) <= folded_off + folded_len:
+                prefix = self.folded(index)[:relative - folded_off]
+                yield index, len(str(prefix, 'utf-8', 'surrogatepass'))
+                position = self._mm.find(needle, position + len(needle), end)
+            else:
+                # Match spans two messages; resume inside the next one
+                position = self._mm.find(needle, self._folded_off + folded_off + folded_len, end)
+
+
+class AssetIndex:
+    """Index of asset pointers and attachments, resolved to files in the export
+
+    ``references`` records which conversation/message points at which file;
+    ``files`` holds the size and SHA-256 of every resolved file. The index is
+    saved as JSON and reused until the archive changes, so queries do not
+    need to reparse conversations.json.
+    """
+
+    def __init__(self, source=None, root=None):
+        self.source = source
+        self.source_stamp = None
+        self.root = root
+        self.files = {}
+        self.references = []
+
+    @staticmethod
+    def iter_asset_pointers(value):
+        """Yield (content_type, asset_pointer, details) for every asset pointer nested in a value"""
+        if isinstance(value, dict):
+            pointer = value.get('asset_pointer')
+            if isinstance(pointer, str):
+                yield value.get('content_type', 'asset_pointer'), pointer, value
+            for child in value.values():
+                if isinstance(child, (dict, list)):
+                    yield from AssetIndex.iter_asset_pointers(child)
+        elif isinstance(value, list):
+            for child in value:
+                yield from AssetIndex.iter_asset_pointers(child)
+
+    @staticmethod
+    def pointer_file_id(pointer):
+        """'file-service://file-abc' and 'sediment://file_abc' both map to the bare file ID"""
+        return pointer.split('://', 1)[-1]
+
+    @staticmethod
+    def stamp(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime]
+
+    def collect_references(self, conversations):
+        for conv in conversations:
+            if not isinstance(conv, dict):
+                continue
+            mapping = conv.get('mapping') or {}
+            for message_id, message_data in mapping.items():
+                if not (isinstance(message_data, dict) and message_data.get('message')):
+                    continue
+                msg = message_data['message']
+                content = msg.get('content', {})
+                base = {
+                    'conversation_id': conv.get('id'),
+                    'message_id': msg.get('id', message_id),
+                    'gizmo_id': conv.get('gizmo_id')
+                }
+
+                if isinstance(content, dict):
+                    for content_type, pointer, details in self.iter_asset_pointers(content.get('parts', [])):
+                        self.references.append(dict(base, kind=content_type, asset_id=self.pointer_file_id(pointer),
+                                                    name=None, declared_size=details.get('size_bytes'), file=None))
+
+                metadata = msg.get('metadata') or {}
+                for attachment in metadata.get('attachments') or []:
+                    if isinstance(attachment, dict) and attachment.get('id'):
+                        self.references.append(dict(base, kind='attachment', asset_id=attachment['id'],
+                                                    name=attachment.get('name'), declared_size=attachment.get('size'),
+                                                    file=None))
+
+    def _list_root(self):
+        """Return (relative paths, opener, stamper, closer) for the export directory or ZIP"""
+        if zipfile.is_zipfile(self.root):
+            with zipfile.ZipFile(self.root) as zf:
+                infos = {info.filename: info for info in zf.infolist() if not info.is_dir()}
+            local = threading.local()
+            handles = []
+            lock = threading.Lock()
+
+            def opener(name):
+                # ZipFile handles are not shared between hashing threads
+                if not hasattr(local, 'zf'):
+                    local.zf = zipfile.ZipFile(self.root)
+                    with lock:
+                        handles.append(local.zf)
+                return local.zf.open(name)
+
+            def closer():
+                for handle in handles:
+                    handle.close()
+                handles.clear()
+
+            return list(infos), opener, (lambda name: [infos[name].file_size, infos[name].CRC]), closer
+
+        names = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                names.append(os.path.relpath(os.path.join(dirpath, filename), self.root))
+        return (names,
+                lambda name: open(os.path.join(self.root, name), 'rb'),
+                lambda name: self.stamp(os.path.join(self.root, name)),
+                lambda: None)
+
+    def resolve(self, names):
+        """Match each reference's file ID to an export file named '<id>', '<id>-...', '<id>.ext' or '<id>_...'
+
+        An exact '<id>' or '<id>.ext' name wins over '<id>-...' and '<id>_...',
+        which would otherwise claim IDs that are a prefix of another file's ID.
+        """
+        by_basename = sorted((os.path.basename(name), name) for name in names)
+        basenames = [b for b, _ in by_basename]
+        for ref in self.references:
+            asset_id = ref['asset_id']
+            best = None
+            i = bisect.bisect_left(basenames, asset_id)
+            while i < len(basenames) and basenames[i].startswith(asset_id):
+                rest = basenames[i][len(asset_id):]
+                if not rest:
+                    rank = 0
+                elif rest[0] == '.':
+                    rank = 1
+                elif rest[0] in '-._':
+                    rank = 2
+                else:
+                    rank = None
+                if rank is not None and (best is None or rank < best[0]):
+                    best = rank, by_basename[i][1]
+                i += 1
+            if best:
+                ref['file'] = best[1]
+
+    def hash_files(self, previous=None, workers=8):
+        """Hash every referenced file in parallel, reusing unchanged entries from a previous index"""
+        names, opener, stamper, closer = self._list_root()
+        self.resolve(names)
+        wanted = sorted({ref['file'] for ref in self.references if ref['file']})
+        stamps = {name: stamper(name) for name in wanted}
+
+        previous = previous or {}
+        pending = []
+        for name in wanted:
+            cached = previous.get(name)
+            if cached and cached.get('stamp') == stamps[name]:
+                self.files[name] = cached
+            else:
+                pending.append(name)
+
+        def digest(name):
+            sha = hashlib.sha256()
+            size = 0
+            with opener(name) as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                    sha.update(chunk)
+                    size += len(chunk)
+            return name, {'size': size, 'sha256': sha.hexdigest(), 'stamp': stamps[name]}
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for name, entry in pool.map(digest, pending):
+                    self.files[name] = entry
+        finally:
+            closer()
+        return len(pending)
+
+    def to_dict(self):
+        return {
+            'version': ASSET_INDEX_VERSION,
+            'source': self.source,
+            'source_stamp': self.source_stamp,
+            'root': self.root,
+            'files': self.files,
+            'references': self.references
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != ASSET_INDEX_VERSION:
+            raise ValueError(f"unsupported asset index version {data.get('version')}")
+        index = cls(data['source'], data['root'])
+        index.source_stamp = data['source_stamp']
+        index.files = data['files']
+        index.references = data['references']
+        return index
+
+    def is_current(self, source, root):
+        """True if the index was built from this archive and root and the archive has not changed"""
+        return (self.source == os.path.abspath(source) and self.root == os.path.abspath(root)
+                and self.source_stamp == self.stamp(source))
+
+    def for_conversation(self, conv_id):
+        return [ref for ref in self.references if ref['conversation_id'] == conv_id]
+
+    def for_asset(self, query):
+        """References whose asset ID, attachment name or resolved file contains the query"""
+        return [ref for ref in self.references
+                if query in ref['asset_id'] or query in (ref['name'] or '') or query in (ref['file'] or '')]
+
+    def duplicates(self):
+        """Groups of distinct files with identical content, keyed by SHA-256"""
+        by_hash = defaultdict(list)
+        for name, entry in self.files.items():
+            by_hash[entry['sha256']].append(name)
+        return {digest: sorted(names) for digest, names in by_hash.items() if len(names) > 1}
+
+    def bytes_by_project(self):
+        """Total bytes of distinct files referenced per project (None for standalone conversations)"""
+        files_by_project = defaultdict(set)
+        for ref in self.references:
+            if ref['file']:
+                files_by_project[ref['gizmo_id']].add(ref['file'])
+        return {gizmo_id: sum(self.files[name]['size'] for name in names)
+                for gizmo_id, names in files_by_project.items()}
+
+
 class ChatGPTArchiveAnalyzer:
     def __init__(self, file_path):
         self.file_path = file_path
@@ -35,7 +1337,12 @@ class ChatGPTArchiveAnalyzer:
         self.projects = {}
         self.user_info = {}
         self.memory_data = []
-        self.content_stats = defaultdict(int)
+        self.content_stats = {}
+        self.project_stats = {}
+        self.schema = SchemaProfiler()
+        self.approx_stats = None
+        self.asset_index = None
+        self.completed_analyses = set()
 
     def load_data(self):
         """Load and parse the JSON file"""
@@ -57,24 +1364,37 @@ class ChatGPTArchiveAnalyzer:
             if not isinstance(conv, dict):
                 continue
 
-            # Collect all top-level fields
-            for field, value in conv.items():
-                self.metadata_fields.add(field)
-                self.field_counts[field] += 1
-
-                # Store sample values (limit to avoid memory issues)
-                if len(self.field_values[field]) < 10:  # Only keep 10 sample values per field
-                    if isinstance(value, (str, int, float, bool)):
-                        self.field_values[field].add(str(value))
-                    elif isinstance(value, list):
-                        self.field_values[field].add(f"list[{len(value)}]")
-                    elif isinstance(value, dict):
-                        self.field_values[field].add(f"dict[{len(value)} keys]")
-                    else:
-                        self.field_values[field].add(f"{type(value).__name__}")
+            self.collect_metadata_fields(conv, self.metadata_fields, self.field_counts, self.field_values)
 
         print(f"📊 Found {len(self.metadata_fields)} metadata fields")
 
+    def analyze_schema(self):
+        """Profile every JSON path, including mapping, message metadata, content and author"""
+        print("\n🧬 Profiling nested schema...")
+
+        for conv in self.data:
+            if isinstance(conv, dict):
+                self.schema.add(conv)
+
+        print(f"📊 Found {len(self.schema.paths)} JSON paths")
+
+    def collect_metadata_fields(self, conv, fields, counts, values):
+        """Record the top-level fields of one conversation into the given containers"""
+        for field, value in conv.items():
+            fields.add(field)
+            counts[field] += 1
+
+            # Store sample values (limit to avoid memory issues)
+            if len(values[field]) < 10:  # Only keep 10 sample values per field
+                if isinstance(value, (str, int, float, bool)):
+                    values[field].add(str(value))
+                elif isinstance(value, list):
+                    values[field].add(f"list[{len(value)}]")
+                elif isinstance(value, dict):
+                    values[field].add(f"dict[{len(value)} keys]")
+                else:
+                    values[field].add(f"{type(value).__name__}")
+
     def analyze_projects_and_gizmos(self):
         """Analyze project/gizmo data"""
         print("\n🏗️ Analyzing projects and gizmos...")
@@ -100,17 +1420,13 @@ class ChatGPTArchiveAnalyzer:
                 template_ids.add(template_id)
 
             # Group conversations by gizmo_id
-            if gizmo_id:
-                if gizmo_id not in self.projects:
-                    self.projects[gizmo_id] = {
-                        'type': gizmo_type,
-                        'template_id': template_id,
-                        'conversations': [],
-                        'titles': set()
-                    }
-                self.projects[gizmo_id]['conversations'].append(conv)
-                if conv.get('title'):
-                    self.projects[gizmo_id]['titles'].add(conv['title'])
+            self.group_project(conv, self.projects)
+
+        self.project_stats = {
+            'gizmo_types': dict(gizmo_types),
+            'template_ids': len(template_ids),
+            'derived_names': {}
+        }
 
         print(f"📁 Found {len(gizmo_ids)} unique gizmo IDs")
         print(f"🏷️ Gizmo types: {dict(gizmo_types)}")
@@ -121,11 +1437,31 @@ class ChatGPTArchiveAnalyzer:
         for gizmo_id, project_data in self.projects.items():
             possible_names = self.extract_project_name(gizmo_id, project_data)
             if possible_names:
+                self.project_stats['derived_names'][gizmo_id] = sorted(possible_names)
                 print(f"  {gizmo_id}: {possible_names}")
 
+    def group_project(self, conv, projects):
+        """Add one conversation to its gizmo_id group in the given projects dict"""
+        gizmo_id = conv.get('gizmo_id')
+        if not gizmo_id:
+            return
+
+        if gizmo_id not in projects:
+            projects[gizmo_id] = {
+                'type': conv.get('gizmo_type'),
+                'template_id': conv.get('conversation_template_id'),
+                'conversations': [],
+                'titles': set()
+            }
+        projects[gizmo_id]['conversations'].append(conv)
+        if conv.get('title'):
+            projects[gizmo_id]['titles'].add(conv['title'])
+
     def extract_project_name(self, gizmo_id, project_data):
         """Try to extract meaningful project names from various sources"""
         names = set()
+        # Sorted so the derived names do not depend on set iteration order
+        titles = sorted(project_data['titles'])
 
         # Method 1: Look for explicit project names in titles
         project_patterns = [
@@ -136,7 +1472,7 @@ class ChatGPTArchiveAnalyzer:
             r'^(.*?)\s+(Plan|Planning|Strategy|Trip|Story|Stories)$',  # Common project suffixes
         ]
 
-        for title in project_data['titles']:
+        for title in titles:
             for pattern in project_patterns:
                 match = re.search(pattern, title, re.IGNORECASE)
                 if match:
@@ -153,7 +1489,7 @@ class ChatGPTArchiveAnalyzer:
 
         # Method 2: Check for titles that are clearly project names
         explicit_project_titles = []
-        for title in project_data['titles']:
+        for title in titles:
             # Skip generic titles
             if title.lower() in ['new chat', 'chat', 'discussion']:
                 continue
@@ -167,9 +1503,9 @@ class ChatGPTArchiveAnalyzer:
             names.add(explicit_project_titles[0])
 
         # Method 3: Find common themes across multiple titles
-        if not names and len(project_data['titles']) > 2:
+        if not names and len(titles) > 2:
             title_words = []
-            for title in list(project_data['titles'])[:8]:  # Check more titles
+            for title in titles[:8]:  # Check more titles
                 # Extract meaningful words (skip short/common words)
                 words = [word for word in title.lower().split()
                         if len(word) > 3 and word not in
@@ -188,9 +1524,9 @@ class ChatGPTArchiveAnalyzer:
                 names.add(common_words[0].title())
 
         # Method 4: Use the most descriptive title as fallback
-        if not names and project_data['titles']:
+        if not names and titles:
             # Find the longest, most descriptive title
-            best_title = max(project_data['titles'], key=lambda t: len(t.split()) if t else 0)
+            best_title = max(titles, key=lambda t: len(t.split()) if t else 0)
             if len(best_title) > 10 and len(best_title) < 40:
                 names.add(best_title)
 
@@ -245,6 +1581,9 @@ class ChatGPTArchiveAnalyzer:
                     'memory_data': memory_info
                 })
 
+        self.user_info = {'profile_data': profile_data}
+        self.memory_data = memory_related_data
+
         print(f"📝 Found {len(profile_data)} conversations with user profile data")
         print(f"🧠 Found {len(memory_related_data)} conversations with memory data")
 
@@ -293,6 +1632,13 @@ class ChatGPTArchiveAnalyzer:
                     role = author.get('role') if isinstance(author, dict) else str(author)
                     message_types[role] += 1
 
+        self.content_stats.update({
+            'total_messages': total_messages,
+            'model_usage': dict(model_usage),
+            'message_types': dict(message_types),
+            'date_range': None
+        })
+
         print(f"💬 Total messages: {total_messages}")
         print(f"🤖 AI models used: {dict(model_usage)}")
         print(f"👥 Message types: {dict(message_types)}")
@@ -300,6 +1646,7 @@ class ChatGPTArchiveAnalyzer:
         if creation_dates:
             earliest = min(creation_dates)
             latest = max(creation_dates)
+            self.content_stats['date_range'] = (earliest.date().isoformat(), latest.date().isoformat())
             print(f"📅 Date range: {earliest.date()} to {latest.date()}")
 
     def analyze_message_content(self):
@@ -333,69 +1680,67 @@ class ChatGPTArchiveAnalyzer:
                             if isinstance(part, str):
                                 total_content_length += len(part)
 
-        print(f"📊 Content types: {dict(content_types)}")
-        print(f"📏 Average message length: {total_content_length // message_count if message_count > 0 else 0} characters")
-
-    def generate_report(self):
-        """Generate comprehensive analysis report"""
-        print("\n" + "="*80)
-        print("🎯 CHATGPT ARCHIVE ANALYSIS REPORT")
-        print("="*80)
-
-        print(f"\n📁 File: {os.path.basename(self.file_path)}")
-        print(f"📊 Total conversations: {len(self.data)}")
-        print(f"🏷️ Conversations with projects: {len([c for c in self.data if isinstance(c, dict) and c.get('gizmo_id')])}")
-        print(f"📋 Standalone conversations: {len([c for c in self.data if isinstance(c, dict) and not c.get('gizmo_id')])}")
-        print(f"📂 Unique projects: {len(self.projects)}")
+        self.content_stats.update({
+            'content_types': dict(content_types),
+            'average_message_length': total_content_length // message_count if message_count > 0 else 0
+        })
 
-        print("\n🔍 ALL METADATA FIELDS DISCOVERED:")
-        print("-" * 40)
-        sorted_fields = sorted(self.metadata_fields)
-        for i, field in enumerate(sorted_fields, 1):
-            samples = list(self.field_values[field])[:3]
-            sample_str = ", ".join(samples) if samples else "no samples"
-            print(f"{i:2d}. {field}: {sample_str}")
+        print(f"📊 Content types: {dict(content_types)}")
+        print(f"📏 Average message length: {self.content_stats['average_message_length']} characters")
 
-        print("\n🏗️ PROJECT ANALYSIS:")
-        print("-" * 40)
-        print(f"Total projects found: {len(self.projects)}")
-        for gizmo_id, project_data in sorted(self.projects.items(), key=lambda x: len(x[1]['conversations']), reverse=True)[:5]:
-            print(f"• {gizmo_id}: {len(project_data['conversations'])} conversations")
-            if project_data['titles']:
-                sample_title = list(project_data['titles'])[0][:50]
-                print(f"  └─ Sample: {sample_title}{'...' if len(sample_title) == 50 else ''}")
-
-        print("\n💾 MEMORY & USER DATA FIELDS:")
-        print("-" * 40)
-        memory_fields = ['memory_scope', 'is_do_not_remember', 'context_scopes', 'sugar_item_id', 'owner']
-        for field in memory_fields:
-            if field in self.metadata_fields:
-                samples = list(self.field_values[field])[:3]
-                print(f"• {field}: {', '.join(samples) if samples else 'present'}")
+    def build_report(self):
+        """Collect the results of the analysis passes into an AnalysisReport"""
+        sorted_projects = sorted(self.projects.items(), key=lambda x: len(x[1]['conversations']), reverse=True)
+        derived_names = self.project_stats.get('derived_names', {})
 
-        print("\n🔐 SECURITY & ACCESS FIELDS:")
-        print("-" * 40)
-        security_fields = ['safe_urls', 'blocked_urls', 'disabled_tool_ids', 'moderation_results']
-        for field in security_fields:
-            if field in self.metadata_fields:
-                print(f"• {field}: present in {self.field_counts[field]} conversations")
+        return AnalysisReport({
+            'file': os.path.basename(self.file_path),
+            'summary': {
+                'total_conversations': len(self.data),
+                'project_conversations': len([c for c in self.data if isinstance(c, dict) and c.get('gizmo_id')]),
+                'standalone_conversations': len([c for c in self.data if isinstance(c, dict) and not c.get('gizmo_id')]),
+                'unique_projects': len(self.projects)
+            },
+            'fields': [{
+                'name': field,
+                'count': self.field_counts[field],
+                'samples': list(self.field_values[field])
+            } for field in sorted(self.metadata_fields)],
+            'projects': [{
+                'id': gizmo_id,
+                'type': project_data['type'],
+                'conversation_count': len(project_data['conversations']),
+                'sample_title': list(project_data['titles'])[0] if project_data['titles'] else None,
+                'derived_names': derived_names.get(gizmo_id, [])
+            } for gizmo_id, project_data in sorted_projects],
+            'gizmo_types': self.project_stats.get('gizmo_types', {}),
+            'template_ids': self.project_stats.get('template_ids', 0),
+            'memory_fields': {field: list(self.field_values[field])[:3]
+                              for field in MEMORY_REPORT_FIELDS if field in self.metadata_fields},
+            'security_fields': {field: self.field_counts[field]
+                                for field in FIELD_CATEGORIES['security'] if field in self.metadata_fields},
+            'user': {
+                'profile_conversations': len(self.user_info.get('profile_data', [])),
+                'memory_conversations': len(self.memory_data),
+                'profile_samples': self.user_info.get('profile_data', [])[:3],
+                'memory_samples': self.memory_data[:3]
+            },
+            'content': dict(self.content_stats)
+        })
 
-        print("\n" + "="*80)
+    def generate_report(self):
+        """Generate comprehensive analysis report"""
+        report = self.build_report()
+        print(report.render_text())
+        return report
 
     def print_fields_analysis(self, category='all', show_values=False):
         """Print detailed field analysis"""
         print("\n🔍 METADATA FIELDS ANALYSIS:")
         print("-" * 40)
 
-        field_categories = {
-            'projects': ['gizmo_id', 'gizmo_type', 'conversation_template_id'],
-            'memory': ['memory_scope', 'is_do_not_remember', 'context_scopes'],
-            'security': ['safe_urls', 'blocked_urls', 'disabled_tool_ids', 'moderation_results'],
-            'user': ['owner', 'sugar_item_id', 'sugar_item_visible', 'is_starred']
-        }
-
         if category != 'all':
-            target_fields = field_categories.get(category, [])
+            target_fields = FIELD_CATEGORIES.get(category, [])
         else:
             target_fields = sorted(self.metadata_fields)
 
@@ -406,6 +1751,26 @@ class ChatGPTArchiveAnalyzer:
                 sample_str = f" (samples: {', '.join(samples)})" if samples else ""
                 print(f"• {field}: present in {count} conversations{sample_str}")
 
+    def print_schema_analysis(self, category='all', show_values=False):
+        """Print the nested schema profile"""
+        print("\n🧬 SCHEMA PROFILE:")
+        print("-" * 40)
+
+        target_fields = FIELD_CATEGORIES.get(category) if category != 'all' else None
+        error = HyperLogLog().relative_error() * 100
+
+        for path, profile in self.schema.report().items():
+            if target_fields is not None and re.split(r'[.\[]', path, 1)[0] not in target_fields:
+                continue
+
+            types = ', '.join(f"{t} {share*100:.1f}%" for t, share in profile['types'].items())
+            distinct = f", ~{profile['distinct_estimate']} distinct (±{error:.1f}%)" if profile['distinct_estimate'] is not None else ""
+            print(f"• {path}: {profile['count']} values ({types}), null {profile['null_rate']*100:.1f}%{distinct}")
+            if profile['min'] is not None:
+                print(f"    range: {profile['min']} .. {profile['max']}")
+            if show_values and profile['samples']:
+                print(f"    samples: {', '.join(str(v) for v in profile['samples'])}")
+
     def print_projects_analysis(self, names_only=False, detailed=False, project_id=None):
         """Print detailed project analysis"""
         print("\n🏗️ PROJECTS ANALYSIS:")
@@ -431,8 +1796,7 @@ class ChatGPTArchiveAnalyzer:
         if names_only:
             print("Project Names (derived):")
             for gizmo_id, project_data in sorted(self.projects.items(), key=lambda x: len(x[1]['conversations']), reverse=True):
-                possible_names = self.extract_project_name(gizmo_id, project_data)
-                name_str = list(possible_names)[0] if possible_names else f"Project {gizmo_id.split('-')[-1][:8]}"
+                name_str = self.project_display_name(gizmo_id, project_data)
                 print(f"• {name_str} ({len(project_data['conversations'])} conversations)")
         elif detailed:
             print(f"Total projects: {len(self.projects)}")
@@ -566,6 +1930,289 @@ class ChatGPTArchiveAnalyzer:
         if len(results) > 20:
             print(f"\n... and {len(results) - 20} more results")
 
+    def analyze_approximate_statistics(self, merge_files=()):
+        """Build fixed-memory sketches of the archive, merged with any saved shard sketches"""
+        print("\n📐 Building approximate statistics sketches...")
+
+        self.approx_stats = ApproximateStats()
+        for conv in self.data:
+            if isinstance(conv, dict):
+                self.approx_stats.add(conv)
+
+        for path in merge_files:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.approx_stats.merge(ApproximateStats.from_dict(json.load(f)))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"❌ Error merging sketch {path}: {e}")
+                sys.exit(1)
+            print(f"🔗 Merged sketch from {path}")
+
+    def save_approximate_statistics(self, output_file):
+        """Save the sketches so they can be merged with other shards later"""
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(self.approx_stats.to_dict(), f, ensure_ascii=False)
+        print(f"💾 Sketch saved to: {output_file}")
+
+    def _print_heavy_hitters(self, label, sketch, n=10):
+        print(f"{label} (~{sketch.distinct.count()} distinct ±{sketch.distinct.relative_error()*100:.1f}%, "
+              f"counts may overcount by ≤{sketch.error_bound()} with {100 - sketch.counts.failure_probability()*100:.1f}% confidence):")
+        for item, count in sketch.top(n):
+            print(f"  {str(item)[:60]}: ~{count}")
+
+    def print_approximate_stats(self, section='general'):
+        """Print approximate statistics with their error bounds"""
+        stats = self.approx_stats
+
+        if section == 'model-usage':
+            print("\n🤖 AI MODEL USAGE (approximate):")
+            print("-" * 40)
+            self._print_heavy_hitters("Models", stats.models)
+
+        elif section == 'timeline':
+            print("\n📅 CONVERSATION TIMELINE (approximate):")
+            print("-" * 40)
+            times = stats.create_times
+            if times.count:
+                print(f"Date range: {datetime.fromtimestamp(times.min).date()} to {datetime.fromtimestamp(times.max).date()}")
+                print(f"Creation date quantiles (±{times.rank_error()*100:.1f}% rank):")
+                for q in (0.25, 0.5, 0.75, 0.9):
+                    print(f"  p{int(q*100)}: {datetime.fromtimestamp(times.quantile(q)).date()}")
+
+                print("\nConversations by month:")
+                for month, count in sorted(stats.months.items()):
+                    print(f"  {month}: {count} conversations")
+
+        elif section == 'projects':
+            print("\n📊 PROJECT STATISTICS (approximate):")
+            print("-" * 40)
+            self._print_heavy_hitters("Largest projects", stats.projects)
+
+        else:
+            lengths = stats.message_lengths
+            print("\n📈 GENERAL STATISTICS (approximate):")
+            print("-" * 40)
+            print(f"Total conversations: {stats.conversations}")
+            print(f"Total messages: {stats.messages}")
+            print(f"Unique projects: ~{stats.projects.distinct.count()} (±{stats.projects.distinct.relative_error()*100:.1f}%)")
+            if lengths.count:
+                quantiles = ', '.join(f"p{int(q*100)} {lengths.quantile(q)}" for q in (0.5, 0.9, 0.99))
+                print(f"Message length (characters, ±{lengths.rank_error()*100:.1f}% rank): "
+                      f"{quantiles}, max {lengths.max}")
+            print()
+            self._print_heavy_hitters("Top titles", stats.titles, n=5)
+            self._print_heavy_hitters("Top words", stats.words)
+            self._print_heavy_hitters("Top models", stats.models, n=5)
+
+    def build_asset_index(self, root=None, index_file=None, rebuild=False, workers=8):
+        """Build or reuse the asset index; the archive is only parsed when the index is missing or stale"""
+        root = os.path.abspath(root or os.path.dirname(os.path.abspath(self.file_path)))
+        source_exists = os.path.exists(self.file_path)
+        previous_files = None
+
+        if index_file and os.path.exists(index_file):
+            try:
+                with open(index_file, 'r', encoding='utf-8') as f:
+                    cached = AssetIndex.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Ignoring unreadable asset index {index_file}: {e}")
+            else:
+                if not rebuild and not source_exists and cached.root == root:
+                    print(f"⚠️ {self.file_path} not found, cannot verify asset index {index_file} is current")
+                    print(f"📇 Using asset index {index_file}")
+                    self.asset_index = cached
+                    return
+                if not rebuild and source_exists and cached.is_current(self.file_path, root):
+                    print(f"📇 Using asset index {index_file}")
+                    self.asset_index = cached
+                    return
+                if cached.root == root:
+                    previous_files = cached.files
+
+        if not source_exists:
+            print(f"❌ File not found: {self.file_path}")
+            sys.exit(1)
+        if self.data is None:
+            self.load_data()
+
+        print("\n📎 Indexing asset pointers and attachments...")
+        index = AssetIndex(os.path.abspath(self.file_path), root)
+        index.source_stamp = AssetIndex.stamp(self.file_path)
+        index.collect_references(self.data)
+        hashed = index.hash_files(previous_files, workers=workers)
+        resolved = sum(1 for ref in index.references if ref['file'])
+        print(f"🔗 {len(index.references)} references, {resolved} resolved to {len(index.files)} files "
+              f"({hashed} hashed, {len(index.files) - hashed} reused)")
+
+        if index_file:
+            with open(index_file, 'w', encoding='utf-8') as f:
+                json.dump(index.to_dict(), f, ensure_ascii=False)
+            print(f"💾 Asset index saved to: {index_file}")
+        self.asset_index = index
+
+    def _print_asset_reference(self, ref):
+        target = ref['file']
+        if target:
+            target += f" ({format_bytes(self.asset_index.files[target]['size'])})"
+        else:
+            target = "❌ not found in export"
+        label = f" '{ref['name']}'" if ref['name'] else ""
+        print(f"• [{ref['kind']}] {ref['asset_id']}{label} → {target}")
+        print(f"   Conversation: {ref['conversation_id']} | Message: {ref['message_id']}")
+
+    def print_asset_report(self, conv_id=None, asset_query=None, duplicates=False, by_project=False):
+        """Print asset index queries"""
+        index = self.asset_index
+        print("\n📎 ASSETS:")
+        print("-" * 40)
+
+        if conv_id:
+            refs = index.for_conversation(conv_id)
+            print(f"Found {len(refs)} asset references in conversation {conv_id}")
+            for ref in refs:
+                self._print_asset_reference(ref)
+        elif asset_query:
+            refs = index.for_asset(asset_query)
+            print(f"Found {len(refs)} references matching '{asset_query}'")
+            for ref in refs:
+                self._print_asset_reference(ref)
+        elif duplicates:
+            groups = index.duplicates()
+            wasted = sum(index.files[names[0]]['size'] * (len(names) - 1) for names in groups.values())
+            print(f"Duplicate groups: {len(groups)} ({format_bytes(wasted)} in redundant copies)")
+            for digest, names in sorted(groups.items(), key=lambda x: len(x[1]), reverse=True):
+                print(f"• {digest[:16]}… {format_bytes(index.files[names[0]]['size'])} × {len(names)}")
+                for name in names:
+                    print(f"   {name}")
+        elif by_project:
+            print("Bytes of distinct referenced files per project:")
+            for gizmo_id, size in sorted(index.bytes_by_project().items(), key=lambda x: x[1], reverse=True):
+                print(f"• {gizmo_id or 'Standalone conversations'}: {format_bytes(size)}")
+        else:
+            resolved = [ref for ref in index.references if ref['file']]
+            print(f"Asset root: {index.root}")
+            print(f"Total references: {len(index.references)}")
+            print(f"Kinds: {dict(Counter(ref['kind'] for ref in index.references))}")
+            print(f"Resolved: {len(resolved)} | Missing: {len(index.references) - len(resolved)}")
+            print(f"Conversations with assets: {len({ref['conversation_id'] for ref in index.references})}")
+            print(f"Distinct files: {len(index.files)} ({format_bytes(sum(f['size'] for f in index.files.values()))})")
+            print(f"Duplicate groups: {len(index.duplicates())}")
+
+    def batch_search(self, matcher, project_id=None, model=None, output_file=None, limit=20):
+        """Report every match of many patterns in one pass over all message text"""
+        print(f"\n🔍 BATCH SEARCH ({len(matcher)} patterns):")
+        print("-" * 40)
+
+        pattern_counts = Counter()
+        matched_conversations = set()
+        shown = 0
+        writer = None
+        f = open(output_file, 'w', newline='', encoding='utf-8') if output_file else None
+        try:
+            if f:
+                writer = csv.writer(f)
+                writer.writerow(['Pattern', 'Conversation ID', 'Message ID', 'Part', 'Offset', 'Match'])
+
+            for conv in self.data:
+                if not isinstance(conv, dict):
+                    continue
+                if project_id and conv.get('gizmo_id') != project_id:
+                    continue
+                if model and conv.get('default_model_slug') != model:
+                    continue
+
+                conv_id = conv.get('id')
+                mapping = conv.get('mapping', {})
+                for message_id, msg_data in mapping.items():
+                    if not (isinstance(msg_data, dict) and msg_data.get('message')):
+                        continue
+                    msg = msg_data['message']
+                    content = msg.get('content', {})
+                    if not isinstance(content, dict):
+                        continue
+                    for part_index, part in enumerate(content.get('parts', [])):
+                        if not isinstance(part, str):
+                            continue
+                        for pattern, offset, text in matcher.finditer(part):
+                            pattern_counts[pattern] += 1
+                            matched_conversations.add(conv_id)
+                            row = [pattern, conv_id, msg.get('id', message_id), part_index, offset, text]
+                            if writer:
+                                writer.writerow(row)
+                            if shown < limit:
+                                print(f"• {pattern!r} in {conv_id} / {row[2]} [part {part_index}, offset {offset}]: {text[:60]}")
+                                shown += 1
+        finally:
+            if f:
+                f.close()
+
+        total = sum(pattern_counts.values())
+        print(f"\nFound {total} matches of {len(pattern_counts)} patterns in {len(matched_conversations)} conversations")
+        if total > shown:
+            print(f"... {total - shown} more matches not shown" + ("" if output_file else " (use --output to save all)"))
+        for pattern, count in pattern_counts.most_common(10):
+            print(f"  {pattern}: {count}")
+        if output_file:
+            print(f"💾 All matches saved to: {output_file}")
+
+    def build_text_snapshot(self, output_file):
+        """Write the memory-mapped message text snapshot"""
+        print(f"🗜️ Writing text snapshot to {output_file}...")
+        conversations, messages = TextSnapshot.build(self.data, output_file, source_file=self.file_path)
+        print(f"✅ Snapshot holds {messages} messages from {conversations} conversations "
+              f"({format_bytes(os.path.getsize(output_file))})")
+
+    def query_text_snapshot(self, snapshot_file, search=None, conv_id=None, dump_file=None, limit=20):
+        """Preview, search or dump message text straight from a snapshot, without parsing the archive"""
+        started = datetime.now()
+        try:
+            snapshot = TextSnapshot(snapshot_file)
+        except (OSError, ValueError) as e:
+            print(f"❌ Error opening snapshot: {e}")
+            sys.exit(1)
+        elapsed = (datetime.now() - started).total_seconds() * 1000
+
+        with snapshot:
+            print(f"📂 Opened {snapshot_file} in {elapsed:.1f} ms: "
+                  f"{snapshot.conversation_count} conversations, {snapshot.message_count} messages")
+            if os.path.exists(self.file_path) and not snapshot.is_current(self.file_path):
+                print(f"⚠️ Snapshot does not match {self.file_path}; rebuild it with --output")
+
+            if search:
+                print(f"\n🔍 SNAPSHOT SEARCH: {search}")
+                print("-" * 40)
+                total = 0
+                for index, offset in snapshot.search(search):
+                    total += 1
+                    if total <= limit:
+                        conv_index, message_id, role = snapshot.message(index)
+                        conversation_id, title = snapshot.conversation(conv_index)[:2]
+                        print(f"{total}. {title[:60]}{'...' if len(title) > 60 else ''}")
+                        print(f"   ID: {conversation_id} | Message: {message_id} [{role}] | Offset: {offset}")
+                print(f"\nFound {total} matches")
+
+            elif conv_id:
+                conv_index = snapshot.find_conversation(conv_id)
+                if conv_index is None:
+                    print(f"❌ Conversation {conv_id} not found")
+                    return
+                _, title, first, count = snapshot.conversation(conv_index)
+                print(f"\nConversation - {title}:")
+                for index in range(first, first + count):
+                    text, truncated = snapshot.preview(index)
+                    print(f"  [{snapshot.message(index)[2]}] {text}{'...' if truncated else ''}")
+
+            elif dump_file:
+                with open(dump_file, 'wb') as f:
+                    for conv_index in range(snapshot.conversation_count):
+                        conversation_id, title, first, count = snapshot.conversation(conv_index)
+                        f.write(f"=== {title} ({conversation_id})\n".encode('utf-8', 'surrogatepass'))
+                        for index in range(first, first + count):
+                            f.write(f"[{snapshot.message(index)[2]}] ".encode('utf-8'))
+                            f.write(snapshot.text(index))
+                            f.write(b"\n")
+                print(f"✅ Message text written to {dump_file}")
+
     def print_model_usage_stats(self):
         """Print AI model usage statistics"""
         print("\n🤖 AI MODEL USAGE:")
@@ -652,73 +2299,341 @@ class ChatGPTArchiveAnalyzer:
         print(f"Unique projects: {len(self.projects)}")
         print(f"Metadata fields discovered: {len(self.metadata_fields)}")
 
-    def export_data(self, format_type='json', data_type='conversations', output_file=None):
-        """Export data in various formats"""
-        print(f"📤 Exporting {data_type} as {format_type} to {output_file}...")
-
-        if data_type == 'conversations':
-            data = self.data
-        elif data_type == 'projects':
-            data = {gid: {
-                'name': list(self.extract_project_name(gid, pdata))[0] if self.extract_project_name(gid, pdata) else f"Project {gid.split('-')[-1][:8]}",
-                'conversation_count': len(pdata['conversations']),
-                'type': pdata['type'],
-                'conversation_ids': [c.get('id') for c in pdata['conversations']]
-            } for gid, pdata in self.projects.items()}
-        elif data_type == 'fields':
-            data = {
-                'all_fields': sorted(list(self.metadata_fields)),
-                'field_counts': dict(self.field_counts),
-                'field_samples': {field: list(samples) for field, samples in self.field_values.items()}
-            }
-        elif data_type == 'stats':
-            data = {
+    def project_display_name(self, gizmo_id, project_data):
+        """Return the first derived name (in sorted order, so it is stable across runs) or a short ID-based fallback"""
+        possible_names = self.extract_project_name(gizmo_id, project_data)
+        return sorted(possible_names)[0] if possible_names else f"Project {gizmo_id.split('-')[-1][:8]}"
+
+    def projects_export_data(self, projects):
+        """Build the exported project summary from grouped project data"""
+        return {gid: {
+            'name': self.project_display_name(gid, pdata),
+            'conversation_count': len(pdata['conversations']),
+            'type': pdata['type'],
+            'conversation_ids': [c.get('id') for c in pdata['conversations']]
+        } for gid, pdata in projects.items()}
+
+    def fields_export_data(self, fields, counts, values):
+        """Build the exported field metadata from collected field data"""
+        return {
+            'all_fields': sorted(list(fields)),
+            'field_counts': dict(counts),
+            'field_samples': {field: list(samples) for field, samples in values.items()}
+        }
+
+    def analyzed_export_data(self, data_type):
+        """Return the export summary for data_type from analysis passes already run, or None"""
+        done = self.completed_analyses
+        if data_type == 'schema' and 'schema' in done:
+            return self.schema.report()
+        if data_type == 'projects' and 'projects' in done:
+            return self.projects_export_data(self.projects)
+        if data_type == 'fields' and 'fields' in done:
+            return self.fields_export_data(self.metadata_fields, self.field_counts, self.field_values)
+        if data_type == 'stats' and {'projects', 'fields'} <= done:
+            return {
                 'total_conversations': len(self.data),
                 'projects': len(self.projects),
-                'standalone_conversations': len([c for c in self.data if isinstance(c, dict) and not c.get('gizmo_id')]),
+                'standalone_conversations': sum(1 for c in self.data if isinstance(c, dict) and not c.get('gizmo_id')),
                 'metadata_fields': len(self.metadata_fields)
             }
+        return None
 
-        if format_type == 'json':
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-        elif format_type == 'csv':
-            # Basic CSV export for conversations
-            import csv
-            with open(output_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(['ID', 'Title', 'Create Time', 'Project ID', 'Message Count'])
-                for conv in self.data:
-                    if isinstance(conv, dict):
-                        mapping = conv.get('mapping', {})
-                        writer.writerow([
-                            conv.get('id', ''),
-                            conv.get('title', ''),
-                            conv.get('create_time', ''),
-                            conv.get('gizmo_id', ''),
-                            len(mapping)
-                        ])
-        elif format_type == 'txt':
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(f"ChatGPT Archive Analysis - {data_type.upper()}\n")
-                f.write("="*50 + "\n\n")
-                if isinstance(data, dict):
-                    for key, value in data.items():
-                        f.write(f"{key}: {value}\n")
-                else:
-                    f.write(str(data))
+    def export_data(self, format_type='json', data_type='conversations', output_file=None):
+        """Export data in various formats"""
+        self.export_targets([(data_type, format_type, output_file)])
+
+    def export_targets(self, targets):
+        """Export several (data_type, format_type, output_file) targets in one pass over the archive
+
+        Each target gets its own writer thread fed through a bounded queue, so
+        serialization and gzip compression (for outputs ending in .gz) run off
+        the main thread while the archive is only walked once. Summaries whose
+        analysis pass has already run are written from its results instead.
+        """
+        writers = []
+        for data_type, format_type, output_file in targets:
+            print(f"📤 Exporting {data_type} as {format_type} to {output_file}...")
+            data = None if data_type == 'conversations' else self.analyzed_export_data(data_type)
+            writers.append(ExportWriter(self, data_type, format_type, output_file, data=data))
+
+        for writer in writers:
+            writer.start()
+
+        streaming = [writer for writer in writers if writer.data is None]
+        if streaming:
+            for conv in self.data:
+                for writer in streaming:
+                    writer.queue.put(conv)
+
+        for writer in writers:
+            writer.queue.put(ExportWriter.END)
+        for writer in writers:
+            writer.join()
+
+        failed = False
+        for writer in writers:
+            if writer.error:
+                print(f"❌ Error exporting to {writer.output_file}: {writer.error}")
+                failed = True
+            else:
+                print(f"✅ Exported to {writer.output_file}")
+
+        if failed:
+            sys.exit(1)
 
-        print(f"✅ Exported to {output_file}")
+    def export_viewer_bundle(self, output_dir, shard_size=BUNDLE_SHARD_SIZE):
+        """Write a manifest plus fixed-size conversation shards for the desktop viewer
+
+        The manifest holds only what the sidebar needs (id, title, date,
+        gizmo_id and derived project name) together with the shard and offset
+        of each conversation, so the viewer can page through it and load
+        conversation bodies lazily.
+        """
+        print(f"📦 Writing viewer bundle to {output_dir} ({shard_size} conversations per shard)...")
+
+        conversations = [c for c in self.data if isinstance(c, dict)]
+        if 'projects' in self.completed_analyses:
+            projects = self.projects
+        else:
+            projects = {}
+            for conv in conversations:
+                self.group_project(conv, projects)
+        project_names = {gid: self.project_display_name(gid, pdata) for gid, pdata in projects.items()}
+
+        # Shards are written to a staging directory and swapped in at the end, so
+        # a rerun never mixes old and new shards or rewrites ones a manifest uses
+        os.makedirs(output_dir, exist_ok=True)
+        staging_dir = tempfile.mkdtemp(prefix='.shards-', dir=output_dir)
+        os.chmod(staging_dir, 0o755)
+
+        entries = []
+        shards = []
+        try:
+            for start in range(0, len(conversations), shard_size):
+                shard_index = len(shards)
+                shard_file = f"shard-{shard_index:05d}.json"
+                chunk = conversations[start:start + shard_size]
+                with open(os.path.join(staging_dir, shard_file), 'w', encoding='utf-8') as f:
+                    json.dump(chunk, f, ensure_ascii=False, separators=(',', ':'))
+                shards.append(f"shards/{shard_file}")
+
+                for offset, conv in enumerate(chunk):
+                    create_time = conv.get('create_time')
+                    gizmo_id = conv.get('gizmo_id')
+                    entries.append({
+                        'index': start + offset,
+                        'id': conv.get('id'),
+                        'title': conv.get('title'),
+                        # UTC date, matching the viewer's toISOString() based dates
+                        'date': datetime.fromtimestamp(create_time, timezone.utc).date().isoformat() if create_time else None,
+                        'gizmo_id': gizmo_id,
+                        'project': project_names.get(gizmo_id),
+                        'shard': shard_index,
+                        'offset': offset
+                    })
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        manifest = {
+            'version': BUNDLE_VERSION,
+            'source': os.path.basename(self.file_path),
+            'conversation_count': len(entries),
+            'shard_size': shard_size,
+            'shards': shards,
+            'conversations': entries
+        }
+
+        # Drop the old manifest before its shards go away, and write the new one
+        # last so it never references shards that are not on disk yet
+        manifest_path = os.path.join(output_dir, 'manifest.json')
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        shard_dir = os.path.join(output_dir, 'shards')
+        old_shard_dir = None
+        if os.path.exists(shard_dir):
+            old_shard_dir = staging_dir + '.old'
+            os.rename(shard_dir, old_shard_dir)
+        os.rename(staging_dir, shard_dir)
+        if old_shard_dir:
+            shutil.rmtree(old_shard_dir)
+
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+        print(f"✅ Wrote {len(entries)} conversations in {len(shards)} shards, manifest: {manifest_path}")
+
+    def ensure_analyzed(self, *steps):
+        """Run each named analysis pass at most once, so later commands reuse its results"""
+        passes = {
+            'fields': self.analyze_metadata_fields,
+            'projects': self.analyze_projects_and_gizmos,
+            'user': self.analyze_user_information,
+            'content': self.analyze_content_statistics,
+            'messages': self.analyze_message_content,
+            'schema': self.analyze_schema
+        }
+        for step in steps:
+            if step not in self.completed_analyses:
+                passes[step]()
+                self.completed_analyses.add(step)
 
     def run_full_analysis(self):
-        """Run complete analysis"""
-        self.load_data()
-        self.analyze_metadata_fields()
-        self.analyze_projects_and_gizmos()
-        self.analyze_user_information()
-        self.analyze_content_statistics()
-        self.analyze_message_content()
-        self.generate_report()
+        """Run complete analysis and return the AnalysisReport"""
+        if self.data is None:
+            self.load_data()
+        self.ensure_analyzed('fields', 'projects', 'user', 'content', 'messages')
+        return self.generate_report()
+
+
+class ExportWriter(threading.Thread):
+    """Writes one export target from conversation records received over a bounded queue
+
+    A writer given precomputed summary data writes that and ignores the records.
+    """
+
+    END = object()  # Sentinel marking the end of the record stream
+
+    def __init__(self, analyzer, data_type, format_type, output_file, queue_size=EXPORT_QUEUE_SIZE, data=None):
+        super().__init__(daemon=True)
+        self.analyzer = analyzer
+        self.data = data
+        self.data_type = data_type
+        self.format_type = format_type
+        self.output_file = output_file
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self._finished = False
+
+    def run(self):
+        try:
+            with self._open_output() as f:
+                self._write(f)
+        except Exception as e:
+            self.error = e
+            # Keep draining so the producer never blocks on a full queue
+            while not self._finished:
+                if self.queue.get() is ExportWriter.END:
+                    self._finished = True
+
+    def _open_output(self):
+        """Open the output file, compressing on this thread when it ends in .gz"""
+        newline = '' if self.format_type == 'csv' else None
+        if self.output_file.endswith('.gz'):
+            return gzip.open(self.output_file, 'wt', encoding='utf-8', newline=newline)
+        return open(self.output_file, 'w', encoding='utf-8', newline=newline)
+
+    def _records(self):
+        """Yield conversation records until the producer sends END"""
+        while True:
+            conv = self.queue.get()
+            if conv is ExportWriter.END:
+                self._finished = True
+                return
+            yield conv
+
+    def _write(self, f):
+        if self.format_type == 'csv':
+            # Basic CSV export for conversations
+            writer = csv.writer(f)
+            writer.writerow(['ID', 'Title', 'Create Time', 'Project ID', 'Message Count'])
+            for conv in self._records():
+                if isinstance(conv, dict):
+                    mapping = conv.get('mapping', {})
+                    writer.writerow([
+                        conv.get('id', ''),
+                        conv.get('title', ''),
+                        conv.get('create_time', ''),
+                        conv.get('gizmo_id', ''),
+                        len(mapping)
+                    ])
+        elif self.data_type == 'conversations':
+            self._write_conversations(f)
+        else:
+            data = self.data if self.data is not None else self._aggregate()
+            if self.format_type == 'json':
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            elif self.format_type == 'txt':
+                self._write_txt_header(f)
+                for key, value in data.items():
+                    f.write(f"{key}: {value}\n")
+
+    def _write_txt_header(self, f):
+        f.write(f"ChatGPT Archive Analysis - {self.data_type.upper()}\n")
+        f.write("="*50 + "\n\n")
+
+    def _write_conversations(self, f):
+        """Stream the conversation list without building the whole document in memory"""
+        if self.format_type == 'json':
+            # Same layout as json.dump(conversations, f, indent=2)
+            count = 0
+            for conv in self._records():
+                item = json.dumps(conv, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+                f.write(('[\n  ' if count == 0 else ',\n  ') + item)
+                count += 1
+            f.write('\n]' if count else '[]')
+        elif self.format_type == 'txt':
+            # Same text as str(conversations)
+            self._write_txt_header(f)
+            f.write('[')
+            for i, conv in enumerate(self._records()):
+                f.write((', ' if i else '') + repr(conv))
+            f.write(']')
+
+    def _aggregate(self):
+        """Consume all records and build the summary for projects, fields, stats or schema"""
+        analyzer = self.analyzer
+        if self.data_type == 'schema':
+            profiler = SchemaProfiler()
+            for conv in self._records():
+                if isinstance(conv, dict):
+                    profiler.add(conv)
+            return profiler.report()
+
+        projects = {}
+        fields = set()
+        counts = defaultdict(int)
+        values = defaultdict(set)
+        total = 0
+        standalone = 0
+
+        for conv in self._records():
+            total += 1
+            if not isinstance(conv, dict):
+                continue
+            analyzer.group_project(conv, projects)
+            if self.data_type != 'projects':
+                analyzer.collect_metadata_fields(conv, fields, counts, values)
+            if not conv.get('gizmo_id'):
+                standalone += 1
+
+        if self.data_type == 'projects':
+            return analyzer.projects_export_data(projects)
+        if self.data_type == 'fields':
+            return analyzer.fields_export_data(fields, counts, values)
+        return {
+            'total_conversations': total,
+            'projects': len(projects),
+            'standalone_conversations': standalone,
+            'metadata_fields': len(fields)
+        }
+
+
+def parse_export_target(value):
+    """Parse a TYPE:FORMAT:PATH export target"""
+    parts = value.split(':', 2)
+    if len(parts) != 3 or not parts[2]:
+        raise argparse.ArgumentTypeError(f"expected TYPE:FORMAT:PATH, got '{value}'")
+    data_type, format_type, output_file = parts
+    if data_type not in EXPORT_TYPES:
+        raise argparse.ArgumentTypeError(f"unknown export type '{data_type}' (choose from {', '.join(EXPORT_TYPES)})")
+    if format_type not in EXPORT_FORMATS:
+        raise argparse.ArgumentTypeError(f"unknown export format '{format_type}' (choose from {', '.join(EXPORT_FORMATS)})")
+    if format_type == 'csv' and data_type != 'conversations':
+        raise argparse.ArgumentTypeError(f"csv export only supports conversations, not '{data_type}'")
+    return data_type, format_type, output_file
 
 
 def create_parser():
@@ -730,11 +2645,18 @@ def create_parser():
 Examples:
   python analyze_chatgpt_archive.py analyze
   python analyze_chatgpt_archive.py fields --category projects
+  python analyze_chatgpt_archive.py fields --deep --values
   python analyze_chatgpt_archive.py projects --names-only
   python analyze_chatgpt_archive.py conversations --id 695c5ef9-e248-832f-ae68-4f15ba2a84fc
   python analyze_chatgpt_archive.py search --project g-p-67f6f442bec08191b02fdd71c03312b1
   python analyze_chatgpt_archive.py stats --model-usage
   python analyze_chatgpt_archive.py export --format json --type projects
+  python analyze_chatgpt_archive.py export --target conversations:csv:convs.csv --target stats:json:stats.json
+  python analyze_chatgpt_archive.py bundle --output viewer-bundle
+  python analyze_chatgpt_archive.py assets --index assets.json --duplicates
+  python analyze_chatgpt_archive.py snapshot --output archive.snap
+  python analyze_chatgpt_archive.py snapshot --open archive.snap --search "python"
+  python analyze_chatgpt_archive.py batch nightly.txt --output-dir reports
         """
     )
 
@@ -746,12 +2668,16 @@ Examples:
     # Analyze command
     analyze_parser = subparsers.add_parser('analyze', help='Run full analysis')
     analyze_parser.add_argument('--output', '-o', help='Save report to file')
+    analyze_parser.add_argument('--format', choices=REPORT_FORMATS,
+                               help='Report file format (default: from --output extension, else text)')
 
     # Fields command
     fields_parser = subparsers.add_parser('fields', help='List and analyze metadata fields')
     fields_parser.add_argument('--category', choices=['all', 'projects', 'memory', 'security', 'user'],
                               default='all', help='Filter fields by category')
     fields_parser.add_argument('--values', action='store_true', help='Show sample values for each field')
+    fields_parser.add_argument('--deep', action='store_true',
+                              help='Profile nested paths (mapping, message metadata, content, author)')
 
     # Projects command
     projects_parser = subparsers.add_parser('projects', help='Analyze project structure')
@@ -772,60 +2698,116 @@ Examples:
     search_parser.add_argument('--content', help='Search in message content')
     search_parser.add_argument('--project', help='Filter by project ID')
     search_parser.add_argument('--model', help='Filter by AI model')
+    search_parser.add_argument('--patterns', metavar='FILE',
+                              help="Batch search message text for every term in FILE (one per line, 're:' for regexes)")
+    search_parser.add_argument('--case-sensitive', action='store_true', help='With --patterns, match case exactly')
+    search_parser.add_argument('--output', '-o', help='With --patterns, save every match as CSV')
+    search_parser.add_argument('--limit', type=int, default=20, help='With --patterns, matches to print (default: 20)')
 
     # Stats command
     stats_parser = subparsers.add_parser('stats', help='Show statistics')
     stats_parser.add_argument('--model-usage', action='store_true', help='Show AI model usage statistics')
     stats_parser.add_argument('--timeline', action='store_true', help='Show conversation timeline')
     stats_parser.add_argument('--projects', action='store_true', help='Show project statistics')
+    stats_parser.add_argument('--approx', action='store_true',
+                             help='Use fixed-memory sketches (quantiles, heavy hitters, distinct counts) with error bounds')
+    stats_parser.add_argument('--save-sketch', metavar='FILE', help='With --approx, save the sketches for merging later')
+    stats_parser.add_argument('--merge-sketch', metavar='FILE', action='append', default=[],
+                             help='With --approx, merge a sketch saved from another shard (repeatable)')
 
     # Export command
     export_parser = subparsers.add_parser('export', help='Export data')
-    export_parser.add_argument('--format', choices=['json', 'csv', 'txt'], default='json')
-    export_parser.add_argument('--type', choices=['conversations', 'projects', 'fields', 'stats'],
+    export_parser.add_argument('--format', choices=EXPORT_FORMATS, default='json',
+                              help='Output format (csv is only available for conversations)')
+    export_parser.add_argument('--type', choices=EXPORT_TYPES,
                               default='conversations', help='Type of data to export')
-    export_parser.add_argument('--output', '-o', required=True, help='Output file path')
+    export_parser.add_argument('--output', '-o', help='Output file path (.gz to compress)')
+    export_parser.add_argument('--target', action='append', type=parse_export_target, default=[],
+                              metavar='TYPE:FORMAT:PATH',
+                              help='Additional export target, repeatable (e.g. stats:json:stats.json)')
+
+    # Bundle command
+    bundle_parser = subparsers.add_parser('bundle', help='Write a sharded, paginated bundle for the desktop viewer')
+    bundle_parser.add_argument('--output', '-o', required=True, help='Output directory')
+    bundle_parser.add_argument('--shard-size', type=int, default=BUNDLE_SHARD_SIZE,
+                              help=f'Conversations per shard file (default: {BUNDLE_SHARD_SIZE})')
+
+    # Assets command
+    assets_parser = subparsers.add_parser('assets', help='Index asset pointers and attachments')
+    assets_parser.add_argument('--root', help='Export directory or ZIP holding the files (default: directory of --file)')
+    assets_parser.add_argument('--index', help='Save/reuse the asset index at this path (rebuilt when the archive changes)')
+    assets_parser.add_argument('--rebuild', action='store_true', help='Rebuild the index even if it is current')
+    assets_parser.add_argument('--workers', type=int, default=8, help='Parallel hashing threads (default: 8)')
+    assets_parser.add_argument('--conversation', help='List assets referenced by a conversation ID')
+    assets_parser.add_argument('--asset', help='List references to an asset ID, attachment name or file path')
+    assets_parser.add_argument('--duplicates', action='store_true', help='Show files with identical content')
+    assets_parser.add_argument('--by-project', action='store_true', help='Show total bytes per project')
+
+    # Snapshot command
+    snapshot_parser = subparsers.add_parser('snapshot', help='Build or query a memory-mapped message text snapshot')
+    snapshot_source = snapshot_parser.add_mutually_exclusive_group(required=True)
+    snapshot_source.add_argument('--output', '-o', help='Build a snapshot of --file at this path')
+    snapshot_source.add_argument('--open', help='Query an existing snapshot (does not parse --file)')
+    snapshot_parser.add_argument('--search', help='With --open, case-insensitive search of message text')
+    snapshot_parser.add_argument('--conversation', help='With --open, preview messages of a conversation ID')
+    snapshot_parser.add_argument('--dump', metavar='FILE', help='With --open, write all message text to FILE')
+    snapshot_parser.add_argument('--limit', type=int, default=20, help='Search results to print (default: 20)')
+
+    # Batch command
+    batch_parser = subparsers.add_parser('batch', help='Run several commands against one loaded archive')
+    batch_parser.add_argument('script', nargs='?', help='File with one subcommand invocation per line')
+    batch_parser.add_argument('--command', '-c', dest='command_line', action='append', default=[],
+                              metavar='"SUBCOMMAND [OPTIONS]"', help='Subcommand invocation to run (repeatable)')
+    batch_parser.add_argument('--output-dir', default='batch-output',
+                              help='Directory for per-command output files (default: batch-output)')
 
     return parser
 
-def main():
-    parser = create_parser()
-    args = parser.parse_args()
-
-    if not args.command:
-        parser.print_help()
-        return
-
-    if not os.path.exists(args.file):
-        print(f"❌ File not found: {args.file}")
-        sys.exit(1)
-
-    analyzer = ChatGPTArchiveAnalyzer(args.file)
-
-    # Load data for all commands
-    analyzer.load_data()
-
+def validate_args(parser, args):
+    """Check option combinations argparse cannot express (exits via parser.error)"""
+    if args.command == 'export' and not (args.output or args.target):
+        parser.error("export requires --output or at least one --target")
+    if args.command == 'export' and args.output and args.format == 'csv' and args.type != 'conversations':
+        parser.error("--format csv only supports --type conversations")
+    if args.command == 'stats' and (args.save_sketch or args.merge_sketch) and not args.approx:
+        parser.error("--save-sketch and --merge-sketch require --approx")
+    if args.command == 'search' and args.patterns and (args.title or args.content):
+        parser.error("--patterns cannot be combined with --title or --content")
+    if args.command == 'search' and args.output and not args.patterns:
+        parser.error("--output requires --patterns")
+    if args.command == 'assets' and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.command == 'bundle' and args.shard_size < 1:
+        parser.error("--shard-size must be at least 1")
+    if args.command == 'snapshot' and args.output and (args.search or args.conversation or args.dump):
+        parser.error("--search, --conversation and --dump require --open")
+
+
+def needs_archive(args):
+    """Whether a command needs conversations.json loaded up front"""
+    # assets loads it only when its index must be rebuilt; snapshot --open reads only the snapshot
+    return args.command != 'assets' and not (args.command == 'snapshot' and args.open)
+
+
+def run_command(analyzer, args):
+    """Run one parsed subcommand against an analyzer whose archive is already loaded"""
     if args.command == 'analyze':
-        analyzer.run_full_analysis()
+        report = analyzer.run_full_analysis()
         if args.output:
-            # Save full report to file
-            with open(args.output, 'w', encoding='utf-8') as f:
-                # Redirect stdout temporarily
-                import io
-                from contextlib import redirect_stdout
-
-                output_buffer = io.StringIO()
-                with redirect_stdout(output_buffer):
-                    analyzer.run_full_analysis()
-                f.write(output_buffer.getvalue())
+            # Rendering only; the analysis itself is not repeated
+            report.save(args.output, args.format)
             print(f"💾 Full report saved to: {args.output}")
 
     elif args.command == 'fields':
-        analyzer.analyze_metadata_fields()
-        analyzer.print_fields_analysis(category=args.category, show_values=args.values)
+        if args.deep:
+            analyzer.ensure_analyzed('schema')
+            analyzer.print_schema_analysis(category=args.category, show_values=args.values)
+        else:
+            analyzer.ensure_analyzed('fields')
+            analyzer.print_fields_analysis(category=args.category, show_values=args.values)
 
     elif args.command == 'projects':
-        analyzer.analyze_projects_and_gizmos()
+        analyzer.ensure_analyzed('projects')
         analyzer.print_projects_analysis(names_only=args.names_only, detailed=args.detailed, project_id=args.id)
 
     elif args.command == 'conversations':
@@ -836,6 +2818,15 @@ def main():
             format_type=args.format
         )
 
+    elif args.command == 'search' and args.patterns:
+        try:
+            matcher = PatternMatcher.from_file(args.patterns, case_sensitive=args.case_sensitive)
+        except (OSError, ValueError) as e:
+            print(f"❌ Error loading patterns: {e}")
+            sys.exit(1)
+        analyzer.batch_search(matcher, project_id=args.project, model=args.model,
+                              output_file=args.output, limit=args.limit)
+
     elif args.command == 'search':
         analyzer.search_conversations(
             title_query=args.title,
@@ -844,19 +2835,156 @@ def main():
             model=args.model
         )
 
+    elif args.command == 'stats' and args.approx:
+        analyzer.analyze_approximate_statistics(merge_files=args.merge_sketch)
+        if args.model_usage:
+            analyzer.print_approximate_stats('model-usage')
+        elif args.timeline:
+            analyzer.print_approximate_stats('timeline')
+        elif args.projects:
+            analyzer.print_approximate_stats('projects')
+        else:
+            analyzer.print_approximate_stats()
+        if args.save_sketch:
+            analyzer.save_approximate_statistics(args.save_sketch)
+
     elif args.command == 'stats':
-        analyzer.analyze_content_statistics()
+        analyzer.ensure_analyzed('content')
         if args.model_usage:
             analyzer.print_model_usage_stats()
         elif args.timeline:
             analyzer.print_timeline_stats()
         elif args.projects:
+            analyzer.ensure_analyzed('projects')
             analyzer.print_project_stats()
         else:
+            analyzer.ensure_analyzed('projects', 'fields')
             analyzer.print_general_stats()
 
     elif args.command == 'export':
-        analyzer.export_data(format_type=args.format, data_type=args.type, output_file=args.output)
+        targets = list(args.target)
+        if args.output:
+            targets.insert(0, (args.type, args.format, args.output))
+        analyzer.export_targets(targets)
+
+    elif args.command == 'assets':
+        analyzer.build_asset_index(root=args.root, index_file=args.index, rebuild=args.rebuild, workers=args.workers)
+        analyzer.print_asset_report(
+            conv_id=args.conversation,
+            asset_query=args.asset,
+            duplicates=args.duplicates,
+            by_project=args.by_project
+        )
+
+    elif args.command == 'snapshot' and args.output:
+        analyzer.build_text_snapshot(args.output)
+
+    elif args.command == 'snapshot':
+        analyzer.query_text_snapshot(args.open, search=args.search, conv_id=args.conversation,
+                                     dump_file=args.dump, limit=args.limit)
+
+    elif args.command == 'bundle':
+        analyzer.export_viewer_bundle(args.output, shard_size=args.shard_size)
+
+
+def batch_output_name(number, command_args):
+    """File name for one batch command's output, e.g. 03-stats-timeline.txt"""
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', ' '.join(command_args)).strip('-')[:60]
+    return f"{number:02d}-{slug or 'command'}.txt"
+
+
+def read_batch_commands(script, commands):
+    """Collect (label, argv) pairs from a script file (one invocation per line) and --command options"""
+    entries = []
+    if script:
+        with open(script, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                argv = shlex.split(line, comments=True)
+                if argv:
+                    entries.append((f"{script}:{line_number}", argv))
+    for i, command in enumerate(commands, 1):
+        entries.append((f"--command {i}", shlex.split(command)))
+    return entries
+
+
+def run_batch(parser, args):
+    """Run several subcommands against one loaded archive, each writing to its own output file"""
+    try:
+        entries = read_batch_commands(args.script, args.command_line)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error reading batch script: {e}")
+        sys.exit(1)
+    if not entries:
+        parser.error("batch needs a script or at least one --command")
+
+    # Validate every invocation before loading anything
+    jobs = []
+    for label, argv in entries:
+        try:
+            command_args = parser.parse_args(argv)
+            if command_args.command in (None, 'batch'):
+                parser.error("each batch line must be a single subcommand other than batch")
+            validate_args(parser, command_args)
+        except SystemExit:
+            print(f"❌ Invalid batch command at {label}: {' '.join(argv)}")
+            sys.exit(2)
+        if command_args.file != parser.get_default('file'):
+            print(f"⚠️ {label}: --file is ignored in batch mode; using {args.file}")
+        jobs.append((argv, command_args))
+
+    # Drop numbered outputs of earlier runs so the directory only holds this run's results
+    output_names = [batch_output_name(number, argv) for number, (argv, _) in enumerate(jobs, 1)]
+    os.makedirs(args.output_dir, exist_ok=True)
+    for name in os.listdir(args.output_dir):
+        if re.match(r'\d{2,}-.*\.txt$', name) and name not in output_names:
+            os.remove(os.path.join(args.output_dir, name))
+
+    analyzer = ChatGPTArchiveAnalyzer(args.file)
+    if any(needs_archive(command_args) for _, command_args in jobs):
+        analyzer.load_data()
+
+    failed = 0
+    for number, ((argv, command_args), output_name) in enumerate(zip(jobs, output_names), 1):
+        output_file = os.path.join(args.output_dir, output_name)
+        print(f"▶️ [{number}/{len(jobs)}] {' '.join(argv)} → {output_file}")
+        with open(output_file, 'w', encoding='utf-8') as f, redirect_stdout(f):
+            try:
+                run_command(analyzer, command_args)
+            except SystemExit as e:
+                # Commands exit after printing their own error
+                if e.code:
+                    failed += 1
+            except Exception as e:
+                print(f"❌ Error: {e}")
+                failed += 1
+
+    print(f"✅ Batch finished: {len(jobs) - failed} succeeded, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+
+def main():
+    parser = create_parser()
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        return
+
+    validate_args(parser, args)
+
+    if not os.path.exists(args.file) and needs_archive(args):
+        print(f"❌ File not found: {args.file}")
+        sys.exit(1)
+
+    if args.command == 'batch':
+        run_batch(parser, args)
+        return
+
+    analyzer = ChatGPTArchiveAnalyzer(args.file)
+    if needs_archive(args):
+        analyzer.load_data()
+    run_command(analyzer, args)
 
 if __name__ == "__main__":
     main()